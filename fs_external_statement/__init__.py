@@ -1 +1 @@
-from . import models, wizard, controllers
\ No newline at end of file
+from . import models, wizard, controllers, cli
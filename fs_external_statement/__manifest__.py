@@ -12,7 +12,7 @@
     "website": "https://focasoftware.com/",
     "license": "AGPL-3",
     "category": "Accounting",
-    "version": "13.0.0.0.0",
+    "version": "13.0.1.0.0",
     'images': ['static/description/icon.png'],
     "application": True,
     "installable": True,
@@ -23,6 +23,7 @@
     ],
     "data": [
         'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
         #'data/external_statement_payment_methods_data.xml',
         #'data/account_account_data.xml',
         #'data/product_template_data.xml',
@@ -43,6 +44,8 @@
         'views/settlement_header_views.xml',
         'views/transaction_detail_views.xml',
         'views/external_statement_payment_methods_views.xml',
+        'views/external_statement_import_job_views.xml',
+        'views/external_statement_inbox_views.xml',
         'views/external_statement_menu.xml',
         'wizard/import_external_statement_wizard_views.xml',
         'views/assets.xml',
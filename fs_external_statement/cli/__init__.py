@@ -0,0 +1 @@
+from . import statement_import
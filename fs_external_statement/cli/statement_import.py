@@ -0,0 +1,99 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+import odoo
+from odoo import SUPERUSER_ID, api
+from odoo.cli import Command
+
+FIELD_TYPES = ('txt', 'csv', 'xls', 'xlsx')
+
+
+class StatementImport(Command):
+    """Importa archivos de Extractos Bancarios Externos sin pasar por el wizard"""
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog=f'{os.path.basename(sys.argv[0])} {self.name}',
+            description=self.__doc__,
+            epilog='Las demás opciones (-d/--database, -c/--config, --db_host, ...) son las de odoo-bin. '
+                   f'Ejemplo: odoo-bin {self.name} -c odoo.conf -d produccion --bank-config "Prisma" '
+                   '"liquidaciones/2024-*.txt"'
+        )
+        parser.add_argument('--bank-config', required=True, help='Nombre de la Configuración del Banco Externo')
+        parser.add_argument(
+            '--field-type', choices=FIELD_TYPES, help='Tipo de archivo; si no se indica, se toma de la extensión'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Procesos que parsean archivos en paralelo (la escritura en la base es siempre secuencial). '
+                 'A diferencia de la bandeja de entrada, que corre en el servidor, la línea de comandos es un '
+                 'único hilo y puede crear procesos con fork'
+        )
+        parser.add_argument('paths', nargs='+', help='Archivos o patrones glob a importar')
+        args, odoo_args = parser.parse_known_args(cmdargs)
+
+        odoo.tools.config.parse_config(odoo_args)
+        dbname = odoo.tools.config['db_name']
+        if not dbname:
+            parser.error('Falta indicar la base de datos (-d/--database)')
+        paths = self._expand_paths(args.paths)
+        if not paths:
+            parser.error('Ningún archivo coincide con las rutas indicadas')
+
+        with odoo.api.Environment.manage():
+            registry = odoo.registry(dbname)
+            with registry.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                failed = self._import_files(env, args, paths)
+        sys.exit(1 if failed else 0)
+
+    def _expand_paths(self, patterns):
+        """Expande los patrones glob y devuelve las rutas de archivos sin repetir, en orden"""
+        paths = []
+        for pattern in patterns:
+            for path in sorted(glob.glob(os.path.expanduser(pattern))) or [pattern]:
+                if os.path.isfile(path) and path not in paths:
+                    paths.append(path)
+        return paths
+
+    def _import_files(self, env, args, paths):
+        """
+        Importa los archivos con el mismo proceso que la bandeja de entrada (un trabajo de importación
+        confirmado por archivo), parseando en paralelo con '--workers'. Imprime el tiempo y la cantidad de registros de cada archivo y devuelve la
+        cantidad de archivos con error.
+        """
+        external_bank_config = env['external.bank.config'].search([('name', '=', args.bank_config)])
+        if len(external_bank_config) != 1:
+            sys.exit(f'Se esperaba una Configuración del Banco Externo "{args.bank_config}", '
+                     f'se encontraron {len(external_bank_config)}')
+
+        start, failed, files = time.time(), 0, []
+        for path in paths:
+            filename = os.path.basename(path)
+            field_type = args.field_type or os.path.splitext(filename)[1].lower().lstrip('.')
+            if field_type not in FIELD_TYPES:
+                self._print_error(filename, 'no se pudo determinar el tipo de archivo')
+                failed += 1
+                continue
+            files.append((path, filename, external_bank_config, field_type, {}))
+
+        results = env['external.statement.import.job']._iter_import_files(files, max_workers=max(args.workers, 1))
+        for _job, path, data, error, parse_time, write_time in results:
+            filename = os.path.basename(path)
+            if error:
+                self._print_error(filename, error)
+                failed += 1
+                continue
+            print(
+                f'{filename}: {len(data.get("settlements", []))} liquidaciones, '
+                f'{len(data.get("transactions", []))} transacciones, {len(data.get("trailers", []))} trailers '
+                f'| parseo {parse_time:.2f}s, escritura {write_time:.2f}s'
+            )
+        print(f'{len(paths) - failed}/{len(paths)} archivos importados en {time.time() - start:.2f}s')
+        return failed
+
+    def _print_error(self, filename, message):
+        print(f'{filename}: ERROR {message}', file=sys.stderr)
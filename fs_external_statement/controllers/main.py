@@ -1,5 +1,15 @@
-from odoo import http
+from odoo import SUPERUSER_ID, http
+from odoo.exceptions import UserError
 from odoo.http import request
+from werkzeug.wsgi import wrap_file
+import hmac
+import json
+import mimetypes
+import os
+from ..utils.file_processor import STREAM_CHUNK_SIZE
+
+# Parámetro del sistema con el token de la ruta de subida para scripts; sin valor la ruta queda deshabilitada
+UPLOAD_TOKEN_PARAM = 'fs_external_statement.upload_token'
 
 class ImportSettlements(http.Controller):
     
@@ -8,3 +18,69 @@ class ImportSettlements(http.Controller):
         action = request.env.ref('fs_external_statement.action_import_external_statement_wizard').read()[0]
         return action
 
+    @http.route('/fs_external_statement/upload', auth="user", type='http', methods=['POST'])
+    def upload_external_statement(self, file=None, bank_config=None, field_type=None, **kw):
+        """
+        Recibe un archivo multipart ('file') con la sesión del usuario y lo encola como trabajo de importación.
+        Como toda ruta con sesión, el formulario debe enviar el 'csrf_token'. 'bank_config' es el id o el nombre
+        de la Configuración del Banco Externo; 'field_type', si no se indica, se toma de la extensión.
+        """
+        return self._upload(request.env, file, bank_config, field_type)
+
+    @http.route('/fs_external_statement/upload/token', auth="public", type='http', methods=['POST'], csrf=False)
+    def upload_external_statement_token(self, file=None, bank_config=None, field_type=None, **kw):
+        """
+        Igual que '/fs_external_statement/upload' pero para scripts, sin sesión ni CSRF: se autentica con el
+        encabezado 'Authorization: Bearer <token>', donde el token es el del parámetro del sistema
+        'fs_external_statement.upload_token'. Los trabajos se crean con el usuario administrador.
+        """
+        token = request.env['ir.config_parameter'].sudo().get_param(UPLOAD_TOKEN_PARAM)
+        authorization = request.httprequest.headers.get('Authorization', '')
+        if not token or not hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+            return self._json_response({'error': 'Token de subida inválido'}, status=403)
+        return self._upload(request.env(user=SUPERUSER_ID), file, bank_config, field_type)
+
+    def _upload(self, env, file, bank_config, field_type):
+        """
+        Encola el archivo subido como trabajo de importación. El archivo se copia por bloques al filestore, sin
+        cargarlo completo en memoria ni pasarlo a base64.
+        """
+        try:
+            if not file or not file.filename:
+                raise UserError("No se proporcionó un archivo ('file')")
+            filename = os.path.basename(file.filename)
+            field_type = field_type or os.path.splitext(filename)[1].lower().lstrip('.')
+            if field_type not in ('txt', 'csv', 'xls', 'xlsx'):
+                raise UserError(f'Tipo de archivo no soportado: "{field_type}"')
+            external_bank_config = env['external.bank.config'].search([
+                ('id', '=', int(bank_config)) if str(bank_config or '').isdigit() else ('name', '=', bank_config)
+            ])
+            if len(external_bank_config) != 1:
+                raise UserError(f'No se encontró una única Configuración del Banco Externo "{bank_config}"')
+            job = env['external.statement.import.job']._create_upload_job(
+                file.stream, filename, external_bank_config, field_type
+            )
+        except UserError as error:
+            return self._json_response({'error': error.name}, status=400)
+        return self._json_response({'job_id': job.id, 'state': job.state}, status=201)
+
+    @http.route('/fs_external_statement/trade_header/<int:trade_header_id>/file', auth="user", type='http')
+    def download_trade_header_file(self, trade_header_id, **kw):
+        """Descarga el archivo original de una Cabecera de Comercio, descomprimiéndolo por bloques"""
+        trade_header = request.env['trade.header'].browse(trade_header_id).exists()
+        if not trade_header:
+            return request.not_found()
+        trade_header.check_access_rights('read')
+        trade_header.check_access_rule('read')
+        return http.Response(
+            wrap_file(request.httprequest.environ, trade_header._open_original_file(), STREAM_CHUNK_SIZE),
+            headers=[
+                ('Content-Type', mimetypes.guess_type(trade_header.filename_external_statement)[0]
+                 or 'application/octet-stream'),
+                ('Content-Disposition', http.content_disposition(trade_header.filename_external_statement)),
+            ],
+            direct_passthrough=True
+        )
+
+    def _json_response(self, values, status=200):
+        return http.Response(json.dumps(values), status=status, content_type='application/json')
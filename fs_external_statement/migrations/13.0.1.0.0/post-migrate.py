@@ -0,0 +1,46 @@
+import base64
+import hashlib
+import io
+import logging
+from odoo import SUPERUSER_ID, api
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """
+    Pasa los archivos originales de las Cabeceras de Comercio, guardados en base64 en la columna
+    'file_external_statement', a adjuntos comprimidos en el filestore y elimina la columna. De paso completa
+    el checksum de las cabeceras importadas antes de que existiera, para detectar archivos repetidos.
+    """
+    if not version:
+        return
+    cr.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'trade_header' AND column_name = 'file_external_statement'
+    """)
+    if not cr.fetchone():
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    cr.execute("""
+        SELECT id FROM trade_header
+        WHERE file_external_statement IS NOT NULL AND file_attachment_id IS NULL
+        ORDER BY id
+    """)
+    trade_header_ids = [row[0] for row in cr.fetchall()]
+    for trade_header_id in trade_header_ids:
+        # De a un archivo por vez para no cargar la tabla completa en memoria
+        cr.execute('SELECT file_external_statement FROM trade_header WHERE id = %s', (trade_header_id,))
+        content = base64.b64decode(bytes(cr.fetchone()[0]))
+        env['trade.header'].browse(trade_header_id)._store_original_file(io.BytesIO(content))
+        # Si el mismo archivo se importó más de una vez, solo la primera cabecera lleva el checksum (es único)
+        file_checksum = hashlib.sha256(content).hexdigest()
+        cr.execute('''
+            UPDATE trade_header SET file_checksum = %s
+            WHERE id = %s AND file_checksum IS NULL
+            AND NOT EXISTS (SELECT 1 FROM trade_header WHERE file_checksum = %s)
+        ''', (file_checksum, trade_header_id, file_checksum))
+        env['trade.header'].flush()
+        env.clear()
+    _logger.info(f'{len(trade_header_ids)} archivos de Cabeceras de Comercio pasados al filestore')
+    cr.execute('ALTER TABLE trade_header DROP COLUMN file_external_statement')
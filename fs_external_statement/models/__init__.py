@@ -1,5 +1,6 @@
 from . import (
     account_bank_statement, account_bank_statement_line, account_journal, reconciliation_widget,
     account_bank_statement_trailer_tax, external_statement_payment_methods, trade_header, settlement_header, transaction_detail,
-    settlement_trailer_tax, config
+    settlement_trailer_tax, config, external_statement_import_mixin, external_statement_import_job,
+    external_statement_inbox, ir_attachment
 )
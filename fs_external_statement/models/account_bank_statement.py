@@ -82,28 +82,60 @@ class AccountBankStatement(models.Model):
         """
         Metodo encargado de crear un 'account.bank.statement' desde 'trade.header'
         """
-        statement_vals = {
+        statement_vals = self._prepare_bank_statement_vals_by_trade_header(
+            trade_header_id, trade_header_name, settlement_number, journal_id, journal_name,
+            sum(transaction_detail_ids.mapped('total'))
+        )
+        bank_statement_id = self.create(statement_vals)
+        return bank_statement_id.id
+
+    def _prepare_bank_statement_vals_by_trade_header(
+            self, trade_header_id, trade_header_name,
+            settlement_number, journal_id, journal_name, balance_end_real
+    ):
+        """
+        Prepara los valores de un 'account.bank.statement' de un número de liquidación de 'trade.header'
+        """
+        return {
             'name': f"{trade_header_name} - {settlement_number} - {journal_name}",
             'journal_id': journal_id,
             'date': fields.Date.today(),
             'balance_start': 0.0,
-            'balance_end_real': sum(transaction_detail_ids.mapped('total')),
+            'balance_end_real': balance_end_real,
             'settlement_number': settlement_number,
             'trade_header_id': trade_header_id
         }
-        bank_statement_id = self.create(statement_vals)
-        return bank_statement_id.id
 
     # Métodos Depend
-    @api.depends('account_bank_statement_trailer_tax_ids.total')
+    @api.depends('account_bank_statement_trailer_tax_ids', 'account_bank_statement_trailer_tax_ids.total',
+                 'account_bank_statement_trailer_tax_ids.parent_type')
     def _compute_tax_amount(self):
-        """Computa el campo tax_total_amount correspondiente al total de los impuestos"""
+        """
+        Computa el campo tax_total_amount correspondiente al total de los impuestos, sumando los trailers de tipo
+        'net' con un único 'read_group' por lote de extractos
+        """
+        totals = {}
+        statement_ids = [record.id for record in self if isinstance(record.id, int)]
+        if statement_ids:
+            TrailerTax = self.env['account.bank.settlement.trailer.tax']
+            TrailerTax.flush(['statement_id', 'parent_type', 'total'])
+            for group in TrailerTax.read_group(
+                domain=[('statement_id', 'in', statement_ids), ('parent_type', '=', 'net')],
+                fields=['statement_id', 'total:sum'],
+                groupby=['statement_id'],
+                lazy=False
+            ):
+                totals[group['statement_id'][0]] = group['total'] or 0.0
         for record in self:
-            record.tax_total_amount = sum(
-                record.account_bank_statement_trailer_tax_ids
-                    .filtered(lambda x: x.parent_type == 'net')
-                    .mapped('total')
-            )
+            if isinstance(record.id, int):
+                record.tax_total_amount = totals.get(record.id, 0.0)
+            else:
+                # Registros nuevos (onchange): los trailers solo están en memoria
+                record.tax_total_amount = sum(
+                    record.account_bank_statement_trailer_tax_ids
+                        .filtered(lambda x: x.parent_type == 'net')
+                        .mapped('total')
+                )
 
     @api.depends('tax_total_amount', 'balance_end')
     def _compute_net_balance_end(self):
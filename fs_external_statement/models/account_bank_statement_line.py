@@ -48,7 +48,22 @@ class AccountBankStatementLine(models.Model):
         """
         Metodo encargado de crear la line del extracto bancario desde el modelo 'trade.header'
         """
-        line_vals = {
+        line_vals = self._prepare_bank_statement_line_vals_by_trade_header(
+            transaction_id, transaction_operation_date, transaction_cover_terminal_posnet,
+            transaction_summary_lot_posnet, transaction_card_number, transaction_coupon_posnet, transaction_total,
+            bank_statement_id
+        )
+        bank_statement_line_id = self.create(line_vals)
+        return bank_statement_line_id.id
+
+    def _prepare_bank_statement_line_vals_by_trade_header(
+            self, transaction_id, transaction_operation_date, transaction_cover_terminal_posnet,
+            transaction_summary_lot_posnet, transaction_card_number, transaction_coupon_posnet, transaction_total, bank_statement_id
+    ):
+        """
+        Prepara los valores de la linea del extracto bancario de una transacción de 'trade.header'
+        """
+        return {
             'date': transaction_operation_date or fields.Date.today(),
             'name': f'Terminal: {transaction_cover_terminal_posnet or "N/A"} - '
                     f'Lote: {transaction_summary_lot_posnet or "N/A"} - '
@@ -61,8 +76,6 @@ class AccountBankStatementLine(models.Model):
             'statement_id': bank_statement_id,
             'external_statement_transaction_detail_id': transaction_id
         }
-        bank_statement_line_id = self.create(line_vals)
-        return bank_statement_line_id.id
 
     # Métodos Depends
     @api.depends('journal_entry_ids')
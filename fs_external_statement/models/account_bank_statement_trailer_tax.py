@@ -1,5 +1,4 @@
 from odoo import api, fields, models
-from odoo.exceptions import ValidationError
 
 
 class AccountBankSettlementTrailerTax(models.Model):
@@ -40,16 +39,13 @@ class AccountBankSettlementTrailerTax(models.Model):
         'settlement.tax', compute='_compute_base_settlement_tax_id', store=True
     )
 
-    @api.constrains('settlement_tax_id', 'statement_id')
-    def _check_unique_tax_per_statement(self):
-        for record in self:
-            others = self.search([
-                ('id', '!=', record.id),
-                ('settlement_tax_id', '=', record.settlement_tax_id.id),
-                ('statement_id', '=', record.statement_id.id),
-            ])
-            if others:
-                raise ValidationError("El impuesto ya existe en este extracto bancario.")
+    _sql_constraints = [
+        (
+            'settlement_tax_statement_unique',
+            'UNIQUE(settlement_tax_id, statement_id)',
+            'El impuesto ya existe en este extracto bancario.'
+        ),
+    ]
 
     @api.depends('settlement_tax_id')
     def _compute_name(self):
@@ -1,5 +1,5 @@
 from . import (
-    external_bank_config, trade_header_config,
+    external_bank_layout_mixin, external_bank_config, trade_header_config,
     trade_header_field_config, settlement_header_config, settlement_header_field_config, transaction_detail_config,
     transaction_detail_field_config, settlement_tax_config, settlement_tax, settlement_tax_line
 )
\ No newline at end of file
@@ -1,8 +1,17 @@
-from odoo import api, fields, models
+from odoo import fields, models, tools
+from odoo.exceptions import UserError
+from ...utils.compiled_layout import CompiledLayout, FieldLayout, SectionLayout, TaxLineLayout
+from ...utils.parse_cache import ExternalStatementParseCache
+import os
+
+# Parámetro del sistema con el tamaño máximo en MB del cache de parseo y su valor por defecto
+PARSE_CACHE_SIZE_PARAM = 'fs_external_statement.parse_cache_max_size_mb'
+PARSE_CACHE_DEFAULT_SIZE_MB = 512
 
 
 class ExternalBankConfig(models.Model):
     _name = "external.bank.config"
+    _inherit = ['external.bank.layout.mixin']
 
     name = fields.Char(
         string='Nombre'
@@ -26,4 +35,141 @@ class ExternalBankConfig(models.Model):
         'settlement.tax.config',
         'external_bank_config_id',
         string='Configuración de Impuestos'
-    )
\ No newline at end of file
+    )
+
+    # Opciones de importación
+    txt_parse_mode = fields.Selection([
+        ('single_pass', 'Una pasada por línea'), ('vectorized', 'Vectorizado (pandas)'), ('streaming', 'Streaming')
+    ], string='Modo de parseo (.txt)', default='single_pass', required=True,
+        help='"Una pasada por línea" recorre el archivo una vez enrutando cada línea por su tipo de registro. '
+             '"Vectorizado" filtra las líneas por prefijo y recorta las columnas con pandas, '
+             'conveniente para archivos de cientos de miles de líneas. '
+             '"Streaming" decodifica y parsea el archivo por bloques y guarda las transacciones por lotes, '
+             'manteniendo acotado el uso de memoria. No aplica a liquidaciones por número de línea: esos '
+             'archivos se importan completos.')
+    import_batch_size = fields.Integer(
+        string='Tamaño de lote de importación',
+        default=5000,
+        help='Cantidad de registros que se insertan por lote al importar en modo streaming'
+    )
+    import_bulk_copy = fields.Boolean(
+        string='Carga masiva (COPY)',
+        default=False,
+        help='Inserta las transacciones y trailers con COPY de PostgreSQL en lugar del ORM. '
+             'Pensado para archivos de cierre de mes con millones de transacciones: no registra '
+             'mensajes ni seguimiento en el chatter de los registros cargados.'
+    )
+    import_in_background = fields.Boolean(
+        string='Importar en segundo plano',
+        default=False,
+        help='El wizard guarda el archivo en un trabajo de importación que procesa un cron en lotes '
+             'confirmados, sin bloquear al usuario. El avance se consulta en el trabajo.'
+    )
+    import_without_tracking = fields.Boolean(
+        string='Importar sin seguimiento',
+        default=False,
+        help='Al importar el archivo y generar los extractos no se registra el seguimiento de cada cabecera, '
+             'liquidación y transacción creada o procesada; en su lugar se publica un único mensaje con el '
+             'resumen en la Cabecera de Comercio. Las modificaciones manuales posteriores se siguen registrando.'
+    )
+    import_parse_cache = fields.Boolean(
+        string='Cache de parseo',
+        default=False,
+        help='Guarda en disco el resultado del parseo de cada archivo. Reanudar un trabajo de importación o '
+             'reintentar un archivo cuya escritura falló, sin cambios en la configuración, no lo parsea de '
+             'nuevo. Los .txt se parsean completos en lugar de por bloques. El tamaño máximo del cache se define '
+             f'en el parámetro del sistema "{PARSE_CACHE_SIZE_PARAM}" (MB).'
+    )
+
+    _sql_constraints = [
+        (
+            'import_batch_size_positive',
+            'CHECK(import_batch_size > 0)',
+            'El tamaño de lote de importación debe ser mayor a 0.'
+        ),
+    ]
+
+    def _get_parse_cache(self):
+        """Devuelve el cache de parseo en el directorio de datos de Odoo, o None si no está habilitado"""
+        self.ensure_one()
+        if not self.import_parse_cache:
+            return None
+        max_size_mb = self.env['ir.config_parameter'].sudo().get_param(
+            PARSE_CACHE_SIZE_PARAM, PARSE_CACHE_DEFAULT_SIZE_MB
+        )
+        return ExternalStatementParseCache(
+            os.path.join(tools.config['data_dir'], 'fs_external_statement', 'parse_cache'),
+            int(max_size_mb) * 1024 * 1024
+        )
+
+    @tools.ormcache('self.id', 'field_type')
+    def _get_compiled_layout(self, field_type):
+        """
+        Compila la configuración del banco para el tipo de archivo en tuplas planas. El resultado queda
+        cacheado por proceso y se invalida al modificar cualquier modelo de configuración.
+        """
+        self.ensure_one()
+        config = self.sudo()
+        return CompiledLayout(
+            field_type=field_type,
+            trade_header=config._compile_section(
+                config.trade_header_config_ids, field_type,
+                'Configuración de Cabecera de Comercio', 'Campo de Configuración de Cabecera de Comercio'
+            ),
+            settlements=config._compile_section(
+                config.settlement_header_config_ids, field_type,
+                'Configuración de Cabecera de Liquidación', 'Campo de Configuración de Cabecera de Liquidación'
+            ),
+            transactions=config._compile_section(
+                config.transaction_detail_config_ids, field_type,
+                'Configuración de Detalle de Transacción', 'Campo de Configuración de Detalle de Transacción'
+            ),
+            trailers=config._compile_section(
+                config.settlement_tax_config_ids, field_type,
+                'Configuración de Impuesto', 'Campo de Configuración de Impuestos', parent_label='Configuración de Impuestos'
+            ),
+            txt_parse_mode=config.txt_parse_mode,
+        )
+
+    def _compile_section(self, section_config_ids, field_type, label, field_label, parent_label=None):
+        """Compila la configuración de una sección ('trade', 'settlement', 'transaction' o 'tax')"""
+        section_config_id = section_config_ids.filtered(lambda l: l.field_type == field_type)[:1]
+        if not section_config_id:
+            raise UserError(f'No se ha encontrado ninguna "{label}" con el tipo "{field_type}"')
+        if not section_config_id.field_config_ids:
+            raise UserError(
+                f'No se ha encontrado ningún "{field_label}" '
+                f'para la {parent_label or label}: "{section_config_id.name}"'
+            )
+        return SectionLayout(
+            name=section_config_id.name,
+            search_type=getattr(section_config_id, 'search_type', False),
+            fields=tuple(self._compile_field(f) for f in section_config_id.field_config_ids),
+        )
+
+    def _compile_field(self, field_config_id):
+        """Compila un campo de configuración en un 'FieldLayout'"""
+        values = {
+            'destination': field_config_id.destination_field_id.name,
+        }
+        for name in FieldLayout._fields:
+            if name in field_config_id._fields:
+                values[name] = field_config_id[name]
+        if field_config_id._name == 'settlement.tax':
+            values.update({
+                'settlement_tax_id': field_config_id.id,
+                'tax_lines': tuple(
+                    TaxLineLayout(
+                        starting_position=tax_line.starting_position,
+                        long=tax_line.long,
+                        decimals_amount=tax_line.decimals_amount,
+                        row=tax_line.row,
+                        col=tax_line.col,
+                        tax_name=tax_line.tax_name,
+                        positions_amount=tax_line.positions_amount,
+                        direction=tax_line.direction,
+                    )
+                    for tax_line in field_config_id.settlement_tax_line_ids
+                ),
+            })
+        return FieldLayout(**values)
@@ -0,0 +1,22 @@
+from odoo import api, models
+
+
+class ExternalBankLayoutMixin(models.AbstractModel):
+    _name = "external.bank.layout.mixin"
+    _description = "Invalidación de layouts compilados de Bancos Externos"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.clear_caches()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.clear_caches()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.clear_caches()
+        return res
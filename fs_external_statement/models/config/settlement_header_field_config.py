@@ -5,6 +5,7 @@ from odoo import api, fields, models
 
 class SettlementHeaderFieldConfig(models.Model):
     _name = "settlement.header.field.config"
+    _inherit = ['external.bank.layout.mixin']
 
     name = fields.Char(compute='_compute_name', string='Nombre')
     settlement_header_config_id = fields.Many2one(
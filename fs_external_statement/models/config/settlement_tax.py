@@ -3,6 +3,7 @@ from odoo import api, fields, models
 
 class SettlementTax(models.Model):
     _name = "settlement.tax"
+    _inherit = ['external.bank.layout.mixin']
 
     name = fields.Char(string='Nombre', required=True)
 
@@ -3,6 +3,7 @@ from odoo import api, fields, models
 
 class SettlementTaxConfig(models.Model):
     _name = "settlement.tax.config"
+    _inherit = ['external.bank.layout.mixin']
 
     name = fields.Char(compute='_compute_name', string='Nombre')
     external_bank_config_id = fields.Many2one(
@@ -3,6 +3,7 @@ from odoo import api, fields, models
 
 class SettlementTaxLine(models.Model):
     _name = "settlement.tax.line"
+    _inherit = ['external.bank.layout.mixin']
     _rec_name = "display_name"
 
     display_name = fields.Char(compute='_compute_display_name', string='Nombre', store=True)
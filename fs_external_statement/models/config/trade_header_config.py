@@ -3,6 +3,7 @@ from odoo import api, fields, models
 
 class TradeHeaderConfig(models.Model):
     _name = "trade.header.config"
+    _inherit = ['external.bank.layout.mixin']
 
     name = fields.Char(compute='_compute_name', string='Nombre')
     external_bank_config_id = fields.Many2one(
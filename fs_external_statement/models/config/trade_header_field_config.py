@@ -3,6 +3,7 @@ from odoo import api, fields, models
 
 class TradeHeaderFieldConfig(models.Model):
     _name = "trade.header.field.config"
+    _inherit = ['external.bank.layout.mixin']
 
     name = fields.Char(compute='_compute_name', string='Nombre')
     trade_header_config_id = fields.Many2one(
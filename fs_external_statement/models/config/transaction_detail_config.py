@@ -3,6 +3,7 @@ from odoo.exceptions import ValidationError
 
 class TransactionDetailConfig(models.Model):
     _name = "transaction.detail.config"
+    _inherit = ['external.bank.layout.mixin']
 
     name = fields.Char(compute='_compute_name', string='Nombre')
     external_bank_config_id = fields.Many2one(
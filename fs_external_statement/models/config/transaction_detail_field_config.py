@@ -4,6 +4,7 @@ from odoo import api, fields, models
 
 class TransactionDetailFieldConfig(models.Model):
     _name = "transaction.detail.field.config"
+    _inherit = ['external.bank.layout.mixin']
 
     name = fields.Char(compute='_compute_name', string='Nombre')
     transaction_detail_config_id = fields.Many2one(
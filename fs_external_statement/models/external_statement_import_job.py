@@ -0,0 +1,529 @@
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import base64
+import hashlib
+import logging
+import mimetypes
+import multiprocessing
+import os
+import time
+from ..utils.file_processor import ExternalStatementFileProcessor, parse_statement_file
+
+_logger = logging.getLogger(__name__)
+
+# Segundos sin actividad tras los cuales un trabajo en proceso se considera interrumpido (p. ej. el proceso
+# se cortó por 'limit_time_real', falta de memoria o un reinicio del servidor)
+JOB_STALE_TIMEOUT = 60 * 60
+
+# Cantidad de ejecuciones interrumpidas tras la cual el cron marca el trabajo con error en lugar de reanudarlo
+JOB_MAX_ATTEMPTS = 3
+
+
+def _timed_parse_statement_file(path, filename, layout):
+    """Parsea un archivo, en este proceso o en uno del pool, y devuelve (datos, error, segundos)"""
+    start = time.time()
+    data, error = parse_statement_file(path, filename, layout)
+    return data, error, time.time() - start
+
+
+class ExternalStatementImportJob(models.Model):
+    """
+    Importación de un archivo en segundo plano. El archivo queda guardado en el trabajo y el cron lo
+    procesa en lotes confirmados (commit), registrando el avance. Si falla, se puede reanudar desde el
+    último lote confirmado.
+    """
+    _name = "external.statement.import.job"
+    _inherit = ['external.statement.import.mixin']
+    _description = "Trabajo de Importación de Extractos Bancarios Externos"
+    _order = 'id desc'
+
+    name = fields.Char(
+        string='Nombre',
+        required=True,
+        readonly=True
+    )
+    user_id = fields.Many2one(
+        'res.users',
+        string='Usuario',
+        default=lambda self: self.env.user,
+        readonly=True
+    )
+    state = fields.Selection(
+        [('pending', 'Pendiente'), ('running', 'En proceso'), ('done', 'Realizado'), ('failed', 'Error')],
+        string='Estado', default='pending', required=True, readonly=True, index=True
+    )
+    stage = fields.Selection(
+        [
+            ('queued', 'En cola'), ('parsing', 'Procesando archivo'), ('settlements', 'Creando liquidaciones'),
+            ('transactions', 'Creando transacciones'), ('trailers', 'Creando trailers'), ('done', 'Finalizado')
+        ],
+        string='Etapa', default='queued', readonly=True
+    )
+    rows_total = fields.Integer(
+        string='Registros totales',
+        readonly=True
+    )
+    rows_done = fields.Integer(
+        string='Registros importados',
+        readonly=True,
+        help='Registros confirmados en la base. Al reanudar un trabajo fallido se continúa desde aquí'
+    )
+    progress = fields.Float(
+        string='Avance',
+        compute='_compute_progress'
+    )
+    date_start = fields.Datetime(
+        string='Inicio',
+        readonly=True
+    )
+    date_end = fields.Datetime(
+        string='Fin',
+        readonly=True
+    )
+    date_heartbeat = fields.Datetime(
+        string='Última actividad',
+        readonly=True,
+        help='Se actualiza con cada lote confirmado. Si un trabajo en proceso no registra actividad por más de '
+             f'{JOB_STALE_TIMEOUT // 60} minutos, el cron lo reanuda'
+    )
+    attempt_count = fields.Integer(
+        string='Ejecuciones',
+        readonly=True,
+        help='Cantidad de veces que se ejecutó el trabajo, contando las reanudaciones'
+    )
+    elapsed = fields.Float(
+        string='Duración (s)',
+        compute='_compute_progress'
+    )
+    error_message = fields.Text(
+        string='Error',
+        readonly=True
+    )
+    file_checksum = fields.Char(
+        string='Checksum del archivo',
+        readonly=True
+    )
+    trade_header_id = fields.Many2one(
+        'trade.header',
+        string='Cabecera de Comercio',
+        readonly=True,
+        ondelete='set null'
+    )
+    inbox_id = fields.Many2one(
+        'external.statement.inbox',
+        string='Bandeja de Entrada',
+        readonly=True,
+        ondelete='set null',
+        help='Bandeja de entrada de la que se tomó el archivo'
+    )
+
+    # Métodos Depends
+    @api.depends('rows_total', 'rows_done', 'date_start', 'date_end')
+    def _compute_progress(self):
+        """Calcula el porcentaje de avance y la duración del trabajo"""
+        now = fields.Datetime.now()
+        for record in self:
+            record.progress = 100.0 * record.rows_done / record.rows_total if record.rows_total else 0.0
+            record.elapsed = (
+                ((record.date_end or now) - record.date_start).total_seconds() if record.date_start else 0.0
+            )
+
+    # Metodos Acciones
+    def action_resume(self):
+        """
+        Vuelve a encolar un trabajo fallido o uno en proceso que quedó interrumpido; continúa desde el último
+        lote confirmado
+        """
+        for record in self:
+            if record.state != 'failed' and not record._is_stale():
+                raise UserError(
+                    'Solo se pueden reanudar trabajos de importación con error o interrumpidos '
+                    f'(en proceso y sin actividad por más de {JOB_STALE_TIMEOUT // 60} minutos)'
+                )
+        self.write({'state': 'pending', 'error_message': False})
+
+    def action_refresh(self):
+        """Recarga la vista para consultar el avance"""
+        return {'type': 'ir.actions.client', 'tag': 'reload'}
+
+    def action_view_trade_header(self):
+        """Acción para ver la 'Cabecera de Comercio' creada"""
+        self.ensure_one()
+        return {
+            'name': 'Cabecera de Comercio',
+            'view_mode': 'form',
+            'res_model': 'trade.header',
+            'res_id': self.trade_header_id.id,
+            'type': 'ir.actions.act_window',
+            'target': 'current',
+        }
+
+    # Metodos Cron
+    @api.model
+    def _cron_run_jobs(self, limit=10):
+        """Procesa los trabajos de importación pendientes, confirmando cada lote"""
+        self._recover_stale_jobs()
+        for job in self.search([('state', '=', 'pending')], order='id', limit=limit):
+            try:
+                job._run()
+            except Exception as error:
+                self.env.cr.rollback()
+                self.env.clear()
+                _logger.exception(f'Error en el trabajo de importación {job.id}')
+                job._mark_failed(error.name if isinstance(error, UserError) else str(error))
+
+    @api.model
+    def _recover_stale_jobs(self):
+        """
+        Reencola los trabajos que quedaron en proceso sin actividad, para que continúen desde el último lote
+        confirmado. Los que ya se interrumpieron 'JOB_MAX_ATTEMPTS' veces se marcan con error.
+        """
+        for job in self.search(self._get_stale_domain(), order='id'):
+            if job.attempt_count >= JOB_MAX_ATTEMPTS:
+                _logger.warning(f'Trabajo de importación {job.id} interrumpido {job.attempt_count} veces')
+                job._mark_failed(
+                    f'El trabajo se interrumpió {job.attempt_count} veces sin terminar; revise el archivo y '
+                    'los límites de tiempo y memoria del servidor antes de reanudarlo'
+                )
+            else:
+                _logger.warning(f'Trabajo de importación {job.id} interrumpido, se reanuda')
+                job.write({'state': 'pending'})
+                job._commit()
+
+    @api.model
+    def _get_stale_limit(self):
+        """Fecha de la última actividad a partir de la cual un trabajo en proceso se considera interrumpido"""
+        return fields.Datetime.subtract(fields.Datetime.now(), seconds=JOB_STALE_TIMEOUT)
+
+    @api.model
+    def _get_stale_domain(self):
+        """Dominio de los trabajos en proceso sin actividad en los últimos 'JOB_STALE_TIMEOUT' segundos"""
+        limit = self._get_stale_limit()
+        return [
+            ('state', '=', 'running'),
+            '|', ('date_heartbeat', '<', limit),
+            '&', ('date_heartbeat', '=', False), ('date_start', '<', limit),
+        ]
+
+    def _is_stale(self):
+        """Indica si el trabajo está en proceso pero sin actividad en los últimos 'JOB_STALE_TIMEOUT' segundos"""
+        self.ensure_one()
+        last_activity = self.date_heartbeat or self.date_start
+        return self.state == 'running' and bool(last_activity) and last_activity < self._get_stale_limit()
+
+    def _run(self):
+        """
+        Procesa el archivo e inserta las liquidaciones, transacciones y trailers en lotes de
+        'import_batch_size' registros, confirmando cada lote y registrando el avance.
+        """
+        self.ensure_one()
+        start = time.time()
+        self.write({
+            'state': 'running',
+            'stage': 'parsing',
+            'date_start': self.date_start or fields.Datetime.now(),
+            'date_end': False,
+            'attempt_count': self.attempt_count + 1,
+        })
+        self._commit()
+
+        job = self._without_tracking()
+        resuming = bool(self.trade_header_id)
+        records = job._parse_job_records()
+        if not resuming:
+            # La cabecera de comercio queda confirmada junto con el total de registros
+            self.write({'rows_total': len(records), 'rows_done': 0})
+            self._commit()
+
+        settlement_ids = {
+            settlement.settlement_number: settlement.id
+            for settlement in self.trade_header_id.settlement_header_ids
+        }
+        payment_methods = {}
+        batch_size = self.external_bank_config_id.import_batch_size
+        for section, batch in self._iter_job_batches(records[self.rows_done:], batch_size):
+            self.stage = section
+            if section == 'settlements':
+                payment_methods = job._get_payment_methods(
+                    [values.get('product', '') for values in batch], payment_methods
+                )
+                settlements = job.env['settlement.header'].create([
+                    job._prepare_settlement_vals(self.trade_header_id, values, payment_methods)
+                    for values in batch
+                ])
+                settlement_ids.update({settlement.settlement_number: settlement.id for settlement in settlements})
+            else:
+                # Las transacciones y trailers de liquidaciones que no están en el archivo se descartan
+                prepare_vals = job._prepare_transaction_vals if section == 'transactions' else job._prepare_trailer_vals
+                vals_list = [
+                    prepare_vals(settlement_ids[values.get('settlement_number')], values)
+                    for values in batch if values.get('settlement_number') in settlement_ids
+                ]
+                if vals_list:
+                    job._create_records(
+                        'transaction.detail' if section == 'transactions' else 'settlement.trailer.tax', vals_list
+                    )
+            self.rows_done += len(batch)
+            self._commit()
+            # Libera el cache del ORM para mantener acotada la memoria entre lotes
+            self.env.clear()
+
+        self.write({'state': 'done', 'stage': 'done', 'date_end': fields.Datetime.now()})
+        if self.external_bank_config_id.import_without_tracking:
+            self.trade_header_id._post_import_summary(time.time() - start)
+        self._commit()
+
+    @api.model
+    def _create_file_job(self, content, filename, external_bank_config, field_type, **values):
+        """
+        Crea y confirma un trabajo en proceso para el contenido de un archivo leído fuera del wizard (bandeja de
+        entrada, línea de comandos), de modo que el intento quede registrado aunque la importación falle.
+        """
+        job = self.create(dict(
+            values,
+            name=filename,
+            file_external_statement=base64.b64encode(content),
+            filename_external_statement=filename,
+            external_bank_config_id=external_bank_config.id,
+            field_type=field_type,
+            state='running',
+            stage='parsing',
+            date_start=fields.Datetime.now(),
+        ))
+        job._commit()
+        return job
+
+    @api.model
+    def _create_upload_job(self, stream, filename, external_bank_config, field_type):
+        """
+        Crea un trabajo pendiente a partir de un archivo subido sin pasarlo a base64: el contenido se copia
+        por bloques al filestore y se asocia al trabajo como adjunto del campo del archivo.
+        """
+        Attachment = self.env['ir.attachment'].sudo()
+        sha256 = hashlib.sha256()
+        temp_path, file_size = Attachment._write_stream_to_temp(stream, hashes=[sha256])
+        try:
+            if not file_size:
+                raise UserError("No se proporcionó contenido de archivo")
+            # Un archivo ya importado se rechaza sin encolarlo
+            self._check_existing_checksum(sha256.hexdigest())
+        except UserError:
+            os.remove(temp_path)
+            raise
+        job = self.create({
+            'name': filename,
+            'filename_external_statement': filename,
+            'external_bank_config_id': external_bank_config.id,
+            'field_type': field_type,
+            'file_checksum': sha256.hexdigest(),
+        })
+        Attachment._create_from_temp(temp_path, {
+            'name': filename,
+            'res_model': self._name,
+            'res_field': 'file_external_statement',
+            'res_id': job.id,
+            'mimetype': mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        })
+        return job
+
+    @api.model
+    def _iter_import_files(self, files, max_workers=0):
+        """
+        Importa archivos del disco (bandeja de entrada, línea de comandos), confirmando cada archivo en su
+        trabajo de importación. 'files' es una lista de (ruta, nombre, configuración del banco, tipo de archivo,
+        valores adicionales del trabajo). Produce por archivo (trabajo, ruta, datos, error, segundos de parseo,
+        segundos de escritura); los trabajos con error ya quedan marcados como fallidos.
+
+        Por defecto los archivos se parsean de a uno en este proceso. Con 'max_workers' mayor a 1 se parsean en
+        paralelo en un pool de procesos creados con fork, por lo que solo debe usarse desde un proceso de un
+        único hilo como la línea de comandos, nunca desde el servidor o el cron: un fork de un proceso con
+        varios hilos puede heredar bloqueos tomados (logging, conexiones) y quedar trabado.
+        """
+        if max_workers and max_workers > 1:
+            yield from self._iter_import_files_pool(files, max_workers)
+            return
+        seen_checksums = set()
+        for path, filename, external_bank_config, field_type, job_values in files:
+            job, file_checksum, layout, error = self._prepare_file_job(
+                path, filename, external_bank_config, field_type, job_values, seen_checksums
+            )
+            if error:
+                yield job, path, None, error, 0.0, 0.0
+                continue
+            yield job._finish_file_job(path, file_checksum, *_timed_parse_statement_file(path, filename, layout))
+
+    @api.model
+    def _iter_import_files_pool(self, files, max_workers):
+        """Variante de '_iter_import_files' que parsea en un pool de procesos e importa a medida que terminan"""
+        pending, waiting, seen_checksums = {}, self.browse(), set()
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            for path, filename, external_bank_config, field_type, job_values in files:
+                job, file_checksum, layout, error = self._prepare_file_job(
+                    path, filename, external_bank_config, field_type, job_values, seen_checksums
+                )
+                if error:
+                    yield job, path, None, error, 0.0, 0.0
+                    continue
+                future = executor.submit(_timed_parse_statement_file, path, filename, layout)
+                pending[future] = (job, path, file_checksum)
+                waiting |= job
+
+            for future in as_completed(pending):
+                job, path, file_checksum = pending[future]
+                # Los trabajos que siguen en el pool registran actividad para que el cron no los reanude
+                waiting -= job
+                if waiting:
+                    waiting._commit()
+                yield job._finish_file_job(path, file_checksum, *future.result())
+
+    @api.model
+    def _prepare_file_job(self, path, filename, external_bank_config, field_type, job_values, seen_checksums):
+        """
+        Crea el trabajo de un archivo del disco y descarta, antes de parsearlo, los archivos ya importados, los
+        repetidos dentro del mismo lote y los de configuraciones incompletas. Devuelve (trabajo, checksum,
+        layout, error).
+        """
+        with open(path, 'rb') as statement_file:
+            content = statement_file.read()
+        job = self._create_file_job(content, filename, external_bank_config, field_type, **job_values)
+        file_checksum = hashlib.sha256(content).hexdigest()
+        try:
+            if file_checksum in seen_checksums:
+                raise UserError('Archivo duplicado: tiene el mismo contenido que otro archivo del mismo lote')
+            job._check_existing_checksum(file_checksum)
+            layout = external_bank_config._get_compiled_layout(field_type)
+        except UserError as error:
+            job._mark_failed(error.name)
+            return job, file_checksum, None, error.name
+        seen_checksums.add(file_checksum)
+        return job, file_checksum, layout, None
+
+    def _finish_file_job(self, path, file_checksum, data, error, parse_time):
+        """
+        Importa un archivo ya parseado y confirma el trabajo, o lo marca como fallido. Devuelve (trabajo, ruta,
+        datos, error, segundos de parseo, segundos de escritura).
+        """
+        if error:
+            self._mark_failed(error)
+            return self, path, None, error, parse_time, 0.0
+        write_start = time.time()
+        try:
+            # Otro proceso (cron, wizard) pudo importar el mismo archivo mientras se parseaba
+            self._check_existing_checksum(file_checksum)
+            self._import_parsed(data, file_checksum)
+            self._commit()
+        except Exception as error:
+            self.env.cr.rollback()
+            self.env.clear()
+            _logger.exception(f'Error al importar el archivo {path}')
+            message = error.name if isinstance(error, UserError) else str(error)
+            self._mark_failed(message)
+            return self, path, None, message, parse_time, time.time() - write_start
+        return self, path, data, None, parse_time, time.time() - write_start
+
+    def _mark_failed(self, error_message):
+        """Registra el error en el trabajo y lo confirma"""
+        self.write({
+            'state': 'failed',
+            'error_message': error_message,
+            'date_end': fields.Datetime.now(),
+        })
+        self._commit()
+
+    def _import_parsed(self, data, file_checksum):
+        """
+        Crea la 'Cabecera de Comercio' con sus liquidaciones, transacciones y trailers a partir de un archivo
+        ya parseado (p. ej. en un proceso de la bandeja de entrada) y da el trabajo por terminado.
+        """
+        self.ensure_one()
+        start = time.time()
+        if not data.get('trade_header'):
+            raise UserError("El archivo no contiene un encabezado válido")
+        job = self._without_tracking()
+        job._check_existing_filename(data['trade_header'].get('filename_external_statement', ''))
+        settlements, transactions, trailers = (
+            data.get('settlements', []), data.get('transactions', []), data.get('trailers', [])
+        )
+        rows_total = len(settlements) + len(transactions) + len(trailers)
+        self.write({'stage': 'settlements', 'file_checksum': file_checksum, 'rows_total': rows_total})
+        trade_header = job._create_trade_header(data['trade_header'], file_checksum)
+        job._create_settlements(trade_header, settlements, transactions, trailers)
+        self.write({
+            'state': 'done',
+            'stage': 'done',
+            'rows_done': rows_total,
+            'trade_header_id': trade_header.id,
+            'date_end': fields.Datetime.now(),
+        })
+        if self.external_bank_config_id.import_without_tracking:
+            trade_header._post_import_summary(time.time() - start)
+        return trade_header
+
+    def _commit(self):
+        """Registra la actividad del trabajo, escribe los cambios pendientes del ORM y confirma la transacción"""
+        self.write({'date_heartbeat': fields.Datetime.now()})
+        self.flush()
+        self.env.cr.commit()
+
+    def _parse_job_records(self):
+        """
+        Parsea el archivo y devuelve la lista ordenada (sección, valores) de liquidaciones, transacciones y
+        trailers. En la primera ejecución crea la 'Cabecera de Comercio'; al reanudar se reutiliza la creada y,
+        con el cache de parseo habilitado, el archivo no se vuelve a parsear.
+        El orden es determinístico, por lo que 'rows_done' indica desde dónde continuar.
+        """
+        file_processor = ExternalStatementFileProcessor(self.env)
+        if self.trade_header_id:
+            # El archivo sin comprimir se liberó al crear la cabecera: se lee la copia guardada en ella
+            with self.trade_header_id._open_original_file() as original_file:
+                file_content = base64.b64encode(original_file.read())
+        else:
+            file_content = self.file_external_statement
+            file_checksum = file_processor.get_file_checksum(file_content)
+            self._check_existing_checksum(file_checksum)
+            self.file_checksum = file_checksum
+
+        sections = {'settlements': [], 'transactions': [], 'trailers': []}
+        trade_header_data = {}
+        for section, values in file_processor.iter_process_file(
+            file_content, self.filename_external_statement, self.external_bank_config_id,
+            self.field_type, file_checksum=self.file_checksum
+        ):
+            if section == 'trade_header':
+                trade_header_data = values
+            else:
+                sections[section].append(values)
+
+        if not self.trade_header_id:
+            if not trade_header_data:
+                raise UserError("El archivo no contiene un encabezado válido")
+            self._check_existing_filename(trade_header_data.get('filename_external_statement', ''))
+            self.trade_header_id = self._create_trade_header(trade_header_data, self.file_checksum)
+        return [
+            (section, values)
+            for section in ('settlements', 'transactions', 'trailers')
+            for values in sections[section]
+        ]
+
+    def _create_trade_header(self, header_data, file_checksum=False):
+        """
+        Al guardar la cabecera su copia comprimida del archivo, se borra el adjunto sin comprimir del trabajo
+        para no guardar el archivo dos veces
+        """
+        trade_header = super()._create_trade_header(header_data, file_checksum)
+        self.file_external_statement = False
+        return trade_header
+
+    def _iter_job_batches(self, records, batch_size):
+        """Agrupa los registros en lotes consecutivos de una misma sección de hasta 'batch_size' registros"""
+        batch, batch_section = [], None
+        for section, values in records:
+            if batch and (section != batch_section or len(batch) >= batch_size):
+                yield batch_section, batch
+                batch = []
+            batch_section = section
+            batch.append(values)
+        if batch:
+            yield batch_section, batch
@@ -0,0 +1,316 @@
+from odoo import fields, models
+from odoo.exceptions import UserError
+import base64
+import io
+import logging
+from ..utils.bulk_loader import ExternalStatementBulkLoader
+from ..utils.file_processor import STREAM_MAX_BUFFERED_RECORDS, ExternalStatementFileProcessor
+
+_logger = logging.getLogger(__name__)
+
+
+class ExternalStatementImportMixin(models.AbstractModel):
+    """
+    Proceso de importación de un archivo de Extracto Bancario Externo, compartido por el wizard de
+    importación y los trabajos de importación en segundo plano.
+    """
+    _name = "external.statement.import.mixin"
+    _description = "Importación de Extractos Bancarios Externos"
+
+    file_external_statement = fields.Binary(
+        string='Archivo de Extracto Bancario Externo',
+        required=True,
+        attachment=True,
+        help="Suba el archivo de liquidación del Extracto Bancario Externo"
+    )
+    filename_external_statement = fields.Char('Nombre del Archivo')
+    external_bank_config_id = fields.Many2one(
+        'external.bank.config',
+        string='Configuración del Banco Externo',
+        required=True
+    )
+    field_type = fields.Selection([
+        ('txt', '.txt'), ('csv', '.csv'), ('xls', '.xls'), ('xlsx', '.xlsx')
+    ], string='Tipo de Archivo', required=True)
+
+    def _without_tracking(self):
+        """
+        Devuelve el registro en un contexto sin seguimiento si la configuración del banco lo indica, para que
+        los registros creados por la importación no generen mensajes por registro
+        """
+        if self.external_bank_config_id.import_without_tracking:
+            return self.with_context(tracking_disable=True)
+        return self
+
+    def _import_file(self):
+        """Procesa el archivo y crea la cabecera de comercio con sus liquidaciones, transacciones y trailers"""
+        file_processor = ExternalStatementFileProcessor(self.env)
+        # Un archivo idéntico a uno ya importado se rechaza antes de parsearlo
+        file_checksum = file_processor.get_file_checksum(self.file_external_statement)
+        self._check_existing_checksum(file_checksum)
+
+        if self._use_streaming(file_processor):
+            trade_header = self._import_stream(file_checksum)
+        else:
+            # Procesar archivo
+            data = file_processor.process_file(
+                self.file_external_statement, self.filename_external_statement, self.external_bank_config_id,
+                self.field_type, file_checksum
+            )
+
+            # Validar datos
+            if not data.get('trade_header'):
+                raise UserError("El archivo no contiene un encabezado válido")
+            # Verificar si ya existe un registro con el mismo nombre de archivo
+            self._check_existing_filename(data['trade_header'].get('filename_external_statement', ''))
+
+            # Crea los el header, settlements, transactions y trailers
+            trade_header = self._create_trade_header(data['trade_header'], file_checksum)
+            self._create_settlements(
+                trade_header, data.get('settlements', []), data.get('transactions', []), data.get('trailers', [])
+            )
+        return trade_header
+
+    def _use_streaming(self, file_processor):
+        """
+        Indica si el archivo se importa en modo streaming. Los layouts que no se pueden procesar por bloques
+        se importan completos aunque el banco tenga configurado el modo streaming.
+        """
+        if self.field_type != 'txt' or self.external_bank_config_id.txt_parse_mode != 'streaming':
+            return False
+        if not file_processor.is_streamable(self.external_bank_config_id._get_compiled_layout(self.field_type)):
+            _logger.warning(
+                f'{self.filename_external_statement}: la configuración "{self.external_bank_config_id.name}" '
+                'no admite el modo streaming (liquidación por número de línea); se importa el archivo completo'
+            )
+            return False
+        return True
+
+    def _check_existing_checksum(self, file_checksum):
+        """Verifica que el contenido del archivo no haya sido importado, aunque tenga otro nombre"""
+        existing_header = self.env['trade.header'].search([
+            ('file_checksum', '=', file_checksum)
+        ], limit=1)
+        if existing_header:
+            raise UserError(
+                f'El archivo ya fue importado en la Cabecera de Comercio "{existing_header.name}" '
+                f'({existing_header.filename_external_statement})'
+            )
+
+    def _check_existing_filename(self, filename):
+        """Verifica que no exista una 'Cabecera de Comercio' con el mismo nombre de archivo"""
+        existing_headers = self.env['trade.header'].search([
+            ('filename_external_statement', '=', filename)
+        ])
+        if existing_headers:
+            raise UserError(
+                f"Ya existe un archivo con el mismo nombre: {filename}"
+            )
+
+    def _import_stream(self, file_checksum=False):
+        """
+        Importa el archivo en modo streaming: la cabecera y las liquidaciones se crean a medida que aparecen,
+        y las transacciones y trailers se insertan en lotes de 'import_batch_size' registros, sin esperar a
+        leer el archivo completo.
+        """
+        file_processor = ExternalStatementFileProcessor(self.env)
+        records = file_processor.iter_process_file(
+            self.file_external_statement, self.filename_external_statement, self.external_bank_config_id,
+            self.field_type, max_buffered=STREAM_MAX_BUFFERED_RECORDS
+        )
+        batch_size = self.external_bank_config_id.import_batch_size
+        trade_header = self.env['trade.header']
+        settlement_ids = {}
+        payment_methods = {}
+        pending = {'transactions': [], 'trailers': []}
+        waiting = {'transactions': [], 'trailers': []}
+
+        for section, values in records:
+            if section == 'trade_header':
+                self._check_existing_filename(values.get('filename_external_statement', ''))
+                trade_header = self._create_trade_header(values, file_checksum)
+            elif section == 'settlements':
+                settlement = self._create_settlement(trade_header, values, payment_methods)
+                settlement_ids[settlement.settlement_number] = settlement.id
+            else:
+                pending[section].append(values)
+                if len(pending[section]) >= batch_size:
+                    waiting[section] += self._flush_stream_batch(section, pending[section], settlement_ids)
+                    pending[section] = []
+                    if len(waiting['transactions']) + len(waiting['trailers']) > STREAM_MAX_BUFFERED_RECORDS:
+                        raise UserError(
+                            f'Más de {STREAM_MAX_BUFFERED_RECORDS} transacciones y trailers del archivo esperan una '
+                            'liquidación que todavía no apareció. Importe el archivo sin el modo streaming'
+                        )
+
+        # Las transacciones y trailers de liquidaciones que nunca aparecieron se descartan
+        for section in pending:
+            self._flush_stream_batch(section, waiting[section] + pending[section], settlement_ids)
+        return trade_header
+
+    def _flush_stream_batch(self, section, batch, settlement_ids):
+        """
+        Inserta un lote de transacciones o trailers del modo streaming. Devuelve los registros cuya
+        liquidación todavía no fue creada para reintentarlos al final del archivo.
+        """
+        vals_list, waiting = [], []
+        for values in batch:
+            settlement_id = settlement_ids.get(values.get('settlement_number'))
+            if not settlement_id:
+                waiting.append(values)
+            elif section == 'transactions':
+                vals_list.append(self._prepare_transaction_vals(settlement_id, values))
+            else:
+                vals_list.append(self._prepare_trailer_vals(settlement_id, values))
+        if vals_list:
+            model = 'transaction.detail' if section == 'transactions' else 'settlement.trailer.tax'
+            self._create_records(model, vals_list)
+            # Libera el cache del ORM para mantener acotada la memoria entre lotes
+            self.env[model].flush()
+            self.env[model].invalidate_cache()
+        return waiting
+
+    def _create_trade_header(self, header_data, file_checksum=False):
+        """Crea el registro de Trade Header"""
+        trade_header = self.env['trade.header'].create({
+            'name': header_data.get('name', 'N/A'),
+            'commerce_number': header_data.get('commerce_number', ''),
+            'filename_external_statement': header_data.get('filename_external_statement', ''),
+            'external_bank_config_id': self.external_bank_config_id.id,
+            'file_checksum': file_checksum,
+        })
+        with self._open_source_file() as source_file:
+            trade_header._store_original_file(source_file)
+        return trade_header
+
+    def _open_source_file(self):
+        """
+        Abre el archivo a importar como stream: desde el filestore si quedó guardado como adjunto, o
+        decodificando el campo si no
+        """
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'file_external_statement'),
+            ('res_id', '=', self.id),
+        ], limit=1)
+        if attachment:
+            return attachment._open_stream()
+        return io.BytesIO(base64.b64decode(self.file_external_statement))
+
+    def _create_settlements(self, trade_header, settlements_data, transactions_data, trailers_data):
+        """
+        Crea los registros de Settlement, Transaction y Trailer del archivo con un 'create' por modelo.
+        Las transacciones y trailers se vinculan a su liquidación por el número de liquidación.
+        """
+        # Agrupar transacciones por número de liquidación
+        transactions_by_settlement = {}
+        for tx in transactions_data:
+            transactions_by_settlement.setdefault(tx['settlement_number'], []).append(tx)
+
+        trailers_by_settlement = {}
+        for tlr in trailers_data:
+            trailers_by_settlement.setdefault(tlr['settlement_number'], []).append(tlr)
+
+        _logger.info(f'trailers_by_settlement -> {trailers_by_settlement}')
+        # Crear todos los asentamientos de una vez, resolviendo los metodos de pago en una sola busqueda
+        payment_methods = self._get_payment_methods(
+            settlement_data.get('product', '') for settlement_data in settlements_data
+        )
+        settlements = self.env['settlement.header'].create([
+            self._prepare_settlement_vals(trade_header, settlement_data, payment_methods)
+            for settlement_data in settlements_data
+        ])
+
+        # Crear transacciones y trailers del archivo completo (ya filtrados por settlement_number)
+        tx_vals, trl_vals = [], []
+        for settlement, settlement_data in zip(settlements, settlements_data):
+            settlement_num = settlement_data['settlement_number']
+            tx_vals += [
+                self._prepare_transaction_vals(settlement.id, tx)
+                for tx in transactions_by_settlement.get(settlement_num, [])
+            ]
+            trl_vals += [
+                self._prepare_trailer_vals(settlement.id, trailer)
+                for trailer in trailers_by_settlement.get(settlement_num, [])
+            ]
+        if tx_vals:
+            self._create_records('transaction.detail', tx_vals)
+        if trl_vals:
+            self._create_records('settlement.trailer.tax', trl_vals)
+        return settlements
+
+    def _create_records(self, model, vals_list):
+        """
+        Crea transacciones o trailers con el ORM o, si el banco lo tiene configurado, con COPY. Ambos caminos
+        rechazan los trailers repetidos con el mensaje de la restricción única del modelo
+        """
+        if self.external_bank_config_id.import_bulk_copy:
+            return ExternalStatementBulkLoader(self.env).load(model, vals_list)
+        return self.env[model].create(vals_list)
+
+    def _get_payment_methods(self, products, payment_methods=None):
+        """
+        Devuelve {nombre: metodo de pago} para los productos dados. Los que no estén en 'payment_methods'
+        se buscan en una sola consulta; los inexistentes quedan como un recordset vacío.
+        """
+        payment_methods = {} if payment_methods is None else payment_methods
+        missing = {product for product in products if product not in payment_methods}
+        if missing:
+            PaymentMethods = self.env['external.statement.payment.methods']
+            for payment_method in PaymentMethods.search([('name', 'in', list(missing))]):
+                payment_methods.setdefault(payment_method.name, payment_method)
+            for product in missing:
+                payment_methods.setdefault(product, PaymentMethods)
+        return payment_methods
+
+    def _create_settlement(self, trade_header, settlement_data, payment_methods=None):
+        """Crea una 'Cabecera de Liquidación' resolviendo el diario desde el metodo de pago"""
+        payment_methods = self._get_payment_methods([settlement_data.get('product', '')], payment_methods)
+        return self.env['settlement.header'].create(
+            self._prepare_settlement_vals(trade_header, settlement_data, payment_methods)
+        )
+
+    def _prepare_settlement_vals(self, trade_header, settlement_data, payment_methods):
+        """Prepara los valores de un 'settlement.header' a partir del mapa de metodos de pago"""
+        # Obtener el metodo de pago del Extracto Bancario Externo
+        external_statement_payment_method = payment_methods[settlement_data.get('product', '')]
+
+        journal_id = (
+            external_statement_payment_method.journal_id.id
+            if external_statement_payment_method and external_statement_payment_method.journal_id
+            else False
+        )
+        if not journal_id:
+            raise UserError(
+                f'No se ha encontrado un diario en el metodo de pago "{external_statement_payment_method.name}" | {settlement_data.get("product", "")}'
+            )
+
+        return {
+            'name': settlement_data['name'],
+            'product': settlement_data['product'],
+            'settlement_number': settlement_data['settlement_number'],
+            'trade_header_id': trade_header.id,
+            'journal_id': journal_id,
+        }
+
+    def _prepare_transaction_vals(self, settlement_id, tx):
+        """Prepara los valores de un 'transaction.detail'"""
+        return {
+            'operation_date': tx.get('operation_date') or fields.Date.today(),# TODO, AGREGAR EL CORRECTO FORMATEADO
+            'cover_terminal_posnet': tx.get('cover_terminal_posnet'),
+            'summary_lot_posnet': tx.get('summary_lot_posnet'),
+            'coupon_posnet': tx.get('coupon_posnet'),
+            'total': tx.get('total').replace('.', '').replace(',', '.') if isinstance(tx.get('total'), str) else tx.get('total'),
+            'card_number': tx.get('card_number'),
+            'settlement_header_id': settlement_id,
+        }
+
+    def _prepare_trailer_vals(self, settlement_id, trailer):
+        """Prepara los valores de un 'settlement.trailer.tax'"""
+        return {
+            'settlement_tax_id': trailer.get('settlement_tax_id'),
+            'settlement_number': trailer.get('settlement_number'),
+            'total': trailer.get('total'),
+            'settlement_header_id': settlement_id
+        }
+
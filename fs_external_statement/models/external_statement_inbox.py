@@ -0,0 +1,164 @@
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+import fnmatch
+import logging
+import os
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Subdirectorios de la bandeja de entrada a donde se mueven los archivos ya procesados
+INBOX_PROCESSED_DIR = 'procesados'
+INBOX_ERROR_DIR = 'errores'
+
+# Antigüedad mínima (en segundos) de un archivo para tomarlo; evita leer archivos que todavía se están copiando
+INBOX_MIN_FILE_AGE = 60
+
+
+class ExternalStatementInbox(models.Model):
+    """
+    Bandeja de entrada de archivos: un directorio local que un cron recorre periódicamente. Cada archivo
+    se asocia a una configuración de banco por reglas de nombre y se parsea e importa de a uno, confirmando
+    por archivo.
+    """
+    _name = "external.statement.inbox"
+    _description = "Bandeja de Entrada de Extractos Bancarios Externos"
+
+    name = fields.Char(
+        string='Nombre',
+        required=True
+    )
+    active = fields.Boolean(
+        string='Activo',
+        default=True
+    )
+    directory = fields.Char(
+        string='Directorio',
+        required=True,
+        help='Directorio local del servidor donde se dejan los archivos a importar. Los archivos importados se '
+             f'mueven al subdirectorio "{INBOX_PROCESSED_DIR}" y los que fallan a "{INBOX_ERROR_DIR}"'
+    )
+    rule_ids = fields.One2many(
+        'external.statement.inbox.rule',
+        'inbox_id',
+        string='Reglas'
+    )
+    import_job_ids = fields.One2many(
+        'external.statement.import.job',
+        'inbox_id',
+        string='Trabajos de Importación'
+    )
+
+    # Metodos Acciones
+    def action_process_inbox(self):
+        """Procesa la bandeja de entrada en el momento"""
+        for record in self:
+            record._process_inbox()
+
+    # Metodos Cron
+    @api.model
+    def _cron_process_inboxes(self):
+        """Procesa los archivos de todas las bandejas de entrada activas"""
+        for inbox in self.search([]):
+            try:
+                inbox._process_inbox()
+            except Exception:
+                self.env.cr.rollback()
+                self.env.clear()
+                _logger.exception(f'Error al procesar la bandeja de entrada "{inbox.name}"')
+
+    def _process_inbox(self):
+        """
+        Parsea e importa de a uno los archivos de la bandeja que coinciden con alguna regla. Cada archivo queda
+        registrado en un trabajo de importación con su resultado.
+        """
+        self.ensure_one()
+        if not os.path.isdir(self.directory):
+            raise UserError(f'El directorio "{self.directory}" de la bandeja de entrada no existe')
+        files = self._get_inbox_files()
+        if not files:
+            return
+
+        results = self.env['external.statement.import.job']._iter_import_files([
+            (path, filename, rule.external_bank_config_id, field_type, {'inbox_id': self.id})
+            for path, filename, rule, field_type in files
+        ])
+        for _job, path, _data, error, _parse_time, _write_time in results:
+            self._move_inbox_file(path, INBOX_ERROR_DIR if error else INBOX_PROCESSED_DIR)
+
+    def _get_inbox_files(self):
+        """Devuelve [(ruta, nombre, regla, tipo de archivo)] de los archivos de la bandeja listos para importar"""
+        files = []
+        now = time.time()
+        with os.scandir(self.directory) as entries:
+            for entry in sorted(entries, key=lambda entry: entry.name):
+                if not entry.is_file() or entry.name.startswith('.'):
+                    continue
+                if now - entry.stat().st_mtime < INBOX_MIN_FILE_AGE:
+                    continue
+                rule = self.rule_ids._match_file(entry.name)
+                if not rule:
+                    _logger.warning(f'Bandeja "{self.name}": ninguna regla coincide con el archivo {entry.name}')
+                    continue
+                field_type = rule._get_field_type(entry.name)
+                if not field_type:
+                    _logger.warning(f'Bandeja "{self.name}": no se pudo determinar el tipo del archivo {entry.name}')
+                    continue
+                files.append((entry.path, entry.name, rule, field_type))
+        return files
+
+    def _move_inbox_file(self, path, subdirectory):
+        """Mueve un archivo de la bandeja a uno de sus subdirectorios sin pisar archivos existentes"""
+        target_directory = os.path.join(self.directory, subdirectory)
+        os.makedirs(target_directory, exist_ok=True)
+        target = os.path.join(target_directory, os.path.basename(path))
+        if os.path.exists(target):
+            root, extension = os.path.splitext(target)
+            target = f'{root}_{time.strftime("%Y%m%d%H%M%S")}{extension}'
+        os.replace(path, target)
+
+
+class ExternalStatementInboxRule(models.Model):
+    """Regla que asocia los archivos de una bandeja de entrada con una configuración de banco"""
+    _name = "external.statement.inbox.rule"
+    _description = "Regla de Bandeja de Entrada de Extractos Bancarios Externos"
+    _order = 'sequence, id'
+
+    sequence = fields.Integer(
+        string='Secuencia',
+        default=10
+    )
+    inbox_id = fields.Many2one(
+        'external.statement.inbox',
+        string='Bandeja de Entrada',
+        required=True,
+        ondelete='cascade'
+    )
+    filename_pattern = fields.Char(
+        string='Patrón del nombre de archivo',
+        required=True,
+        help='Patrón estilo shell, sin distinguir mayúsculas, p. ej. "CABAL_*.xlsx" o "*prisma*.txt"'
+    )
+    external_bank_config_id = fields.Many2one(
+        'external.bank.config',
+        string='Configuración del Banco Externo',
+        required=True
+    )
+    field_type = fields.Selection([
+        ('txt', '.txt'), ('csv', '.csv'), ('xls', '.xls'), ('xlsx', '.xlsx')
+    ], string='Tipo de Archivo', help='Si no se indica, se toma de la extensión del archivo')
+
+    def _match_file(self, filename):
+        """Devuelve la primera regla (por secuencia) cuyo patrón coincide con el nombre del archivo"""
+        for rule in self:
+            if fnmatch.fnmatch(filename.lower(), rule.filename_pattern.lower()):
+                return rule
+        return self.browse()
+
+    def _get_field_type(self, filename):
+        """Tipo de archivo de la regla o, si no tiene, el de la extensión del archivo"""
+        self.ensure_one()
+        if self.field_type:
+            return self.field_type
+        extension = os.path.splitext(filename)[1].lower().lstrip('.')
+        return extension if extension in ('txt', 'csv', 'xls', 'xlsx') else False
@@ -0,0 +1,70 @@
+from odoo import api, models
+import base64
+import gzip
+import hashlib
+import io
+import os
+import tempfile
+from ..utils.file_processor import STREAM_CHUNK_SIZE
+
+
+class IrAttachment(models.Model):
+    _inherit = 'ir.attachment'
+
+    @api.model
+    def _write_stream_to_temp(self, stream, compress=False, hashes=()):
+        """
+        Copia un stream por bloques a un archivo temporal dentro del filestore, opcionalmente comprimido con
+        gzip, actualizando 'hashes' con el contenido original. Devuelve (ruta, tamaño original).
+        """
+        filestore = self._filestore()
+        os.makedirs(filestore, exist_ok=True)
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=filestore, delete=False) as temp_file:
+            # mtime=0: el mismo contenido genera siempre el mismo archivo comprimido y por lo tanto el mismo checksum
+            target = gzip.GzipFile(filename='', mode='wb', fileobj=temp_file, mtime=0) if compress else temp_file
+            try:
+                for chunk in iter(lambda: stream.read(STREAM_CHUNK_SIZE), b''):
+                    for file_hash in hashes:
+                        file_hash.update(chunk)
+                    target.write(chunk)
+                    size += len(chunk)
+            finally:
+                if compress:
+                    target.close()
+        return temp_file.name, size
+
+    @api.model
+    def _create_from_temp(self, temp_path, vals):
+        """
+        Crea un adjunto a partir de un archivo temporal de '_write_stream_to_temp', moviéndolo al filestore con
+        el esquema de nombres de Odoo (<sha1[:2]>/<sha1>). Un contenido ya guardado se reutiliza.
+        """
+        try:
+            if self._storage() != 'file':
+                with open(temp_path, 'rb') as temp_file:
+                    return self.create(dict(vals, datas=base64.b64encode(temp_file.read())))
+            sha1 = hashlib.sha1()
+            with open(temp_path, 'rb') as temp_file:
+                for chunk in iter(lambda: temp_file.read(STREAM_CHUNK_SIZE), b''):
+                    sha1.update(chunk)
+            checksum = sha1.hexdigest()
+            store_fname = f'{checksum[:2]}/{checksum}'
+            full_path = self._full_path(store_fname)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            file_size = os.path.getsize(temp_path)
+            if not os.path.isfile(full_path):
+                os.replace(temp_path, full_path)
+            return self.create(dict(vals, store_fname=store_fname, file_size=file_size, checksum=checksum))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _open_stream(self, compressed=False):
+        """Abre el contenido del adjunto para leerlo por bloques, descomprimiéndolo si se guardó con gzip"""
+        self.ensure_one()
+        if self.store_fname:
+            full_path = self._full_path(self.store_fname)
+            return gzip.open(full_path, 'rb') if compressed else open(full_path, 'rb')
+        stream = io.BytesIO(base64.b64decode(self.datas or b''))
+        return gzip.GzipFile(fileobj=stream, mode='rb') if compressed else stream
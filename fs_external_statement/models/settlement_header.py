@@ -77,7 +77,12 @@ class SettlementHeader(models.Model):
     )
     transactions_count = fields.Integer(
         string='Cantidad de Transacciones',
-        compute='_compute_transactions_count',
+        compute='_compute_transaction_counts',
+        store=True
+    )
+    processed_count = fields.Integer(
+        string='Transacciones Procesadas',
+        compute='_compute_transaction_counts',
         store=True
     )
 
@@ -97,25 +102,65 @@ class SettlementHeader(models.Model):
     # Métodos Depends
     @api.depends('transaction_detail_ids', 'transaction_detail_ids.total')
     def _compute_totals(self):
-        """Calcula el monto total de los 'Detalles de transacción'  relacionados"""
+        """
+        Calcula el monto total de los 'Detalles de transacción' relacionados con un único 'read_group' por lote
+        de liquidaciones, sin cargar las transacciones en el cache
+        """
+        totals = {}
+        settlement_ids = [record.id for record in self if isinstance(record.id, int)]
+        if settlement_ids:
+            TransactionDetail = self.env['transaction.detail']
+            TransactionDetail.flush(['settlement_header_id', 'total'])
+            for group in TransactionDetail.read_group(
+                domain=[('settlement_header_id', 'in', settlement_ids)],
+                fields=['settlement_header_id', 'total:sum'],
+                groupby=['settlement_header_id'],
+                lazy=False
+            ):
+                totals[group['settlement_header_id'][0]] = group['total'] or 0.0
         for record in self:
-            record.total_amount = sum(record.transaction_detail_ids.mapped('total'))
+            if isinstance(record.id, int):
+                record.total_amount = totals.get(record.id, 0.0)
+            else:
+                # Registros nuevos (onchange): las transacciones solo están en memoria
+                record.total_amount = sum(record.transaction_detail_ids.mapped('total'))
 
-    @api.depends('transaction_detail_ids')
-    def _compute_transactions_count(self):
-        """Calcula el número de transacciones"""
+    @api.depends('transaction_detail_ids', 'transaction_detail_ids.processed')
+    def _compute_transaction_counts(self):
+        """
+        Cuenta las transacciones y las procesadas con un único 'read_group' por lote de liquidaciones, sin
+        cargar las transacciones en el cache
+        """
+        counts = {}
+        settlement_ids = [record.id for record in self if isinstance(record.id, int)]
+        if settlement_ids:
+            TransactionDetail = self.env['transaction.detail']
+            TransactionDetail.flush(['settlement_header_id', 'processed'])
+            for group in TransactionDetail.read_group(
+                domain=[('settlement_header_id', 'in', settlement_ids)],
+                fields=['settlement_header_id', 'processed'],
+                groupby=['settlement_header_id', 'processed'],
+                lazy=False
+            ):
+                counts[(group['settlement_header_id'][0], group['processed'])] = group['__count']
         for record in self:
-            record.transactions_count = len(record.transaction_detail_ids)
+            if isinstance(record.id, int):
+                record.processed_count = counts.get((record.id, True), 0)
+                record.transactions_count = record.processed_count + counts.get((record.id, False), 0)
+            else:
+                # Registros nuevos (onchange): las transacciones solo están en memoria
+                record.transactions_count = len(record.transaction_detail_ids)
+                record.processed_count = len(record.transaction_detail_ids.filtered('processed'))
 
-    @api.depends('transaction_detail_ids', 'transaction_detail_ids.processed')
+    @api.depends('transactions_count', 'processed_count')
     def _compute_state(self):
-        """Calcula el estado basado en las transacciones"""
+        """Calcula el estado a partir de la cantidad de transacciones y de transacciones procesadas"""
         for record in self:
-            if not record.transaction_detail_ids:
+            if not record.transactions_count:
                 record.state = 'draft'
-            elif all(tx.processed for tx in record.transaction_detail_ids):
+            elif record.processed_count == record.transactions_count:
                 record.state = 'processed'
-            elif any(tx.processed for tx in record.transaction_detail_ids):
+            elif record.processed_count:
                 record.state = 'partial'
             else:
                 record.state = 'draft'
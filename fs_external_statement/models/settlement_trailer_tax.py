@@ -1,5 +1,4 @@
 from odoo import api, fields, models
-from odoo.exceptions import ValidationError
 
 class SettlementTrailer(models.Model):
     _name = "settlement.trailer.tax"
@@ -74,16 +73,13 @@ class SettlementTrailer(models.Model):
         'settlement.tax', compute='_compute_base_settlement_tax_id', store=True
     )
 
-    @api.constrains('settlement_tax_id', 'settlement_header_id')
-    def _check_unique_tax_per_statement(self):
-        for record in self:
-            others = self.search([
-                ('id', '!=', record.id),
-                ('settlement_tax_id', '=', record.settlement_tax_id.id),
-                ('settlement_header_id', '=', record.settlement_header_id.id),
-            ])
-            if others:
-                raise ValidationError("El impuesto ya existe en esta cabecera de liquidación.")
+    _sql_constraints = [
+        (
+            'settlement_tax_settlement_header_unique',
+            'UNIQUE(settlement_tax_id, settlement_header_id)',
+            'El impuesto ya existe en esta cabecera de liquidación.'
+        ),
+    ]
 
     @api.depends('settlement_tax_id')
     def _compute_name(self):
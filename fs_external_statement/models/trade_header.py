@@ -1,6 +1,8 @@
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
 import logging
+import time
+from ..utils.bulk_loader import ExternalStatementBulkLoader
 
 _logger = logging.getLogger(__name__)
 
@@ -22,13 +24,24 @@ class TradeHeader(models.Model):
         required=True,
         tracking=True
     )
-    file_external_statement = fields.Binary(
+    file_attachment_id = fields.Many2one(
+        'ir.attachment',
         string='Archivo',
-        required=True
+        readonly=True,
+        copy=False,
+        help='Archivo original importado, guardado comprimido (gzip) en el filestore'
     )
     filename_external_statement = fields.Char(
         string='Nombre original del archivo',
-        required=True
+        required=True,
+        index=True
+    )
+    file_checksum = fields.Char(
+        string='Checksum del archivo',
+        index=True,
+        readonly=True,
+        copy=False,
+        help='SHA-256 del contenido del archivo importado, usado para detectar archivos ya importados'
     )
     filename_external_statement_view = fields.Char(
         string='Nombre del archivo',
@@ -40,6 +53,11 @@ class TradeHeader(models.Model):
         string='Estado', default='draft', tracking=True, index=True, compute='_compute_state', store=True
     )
     # Relaciones
+    external_bank_config_id = fields.Many2one(
+        'external.bank.config',
+        string='Configuración del Banco Externo',
+        help='Configuración con la que se importó el archivo'
+    )
     settlement_header_ids = fields.One2many(
         'settlement.header',
         'trade_header_id',
@@ -56,9 +74,23 @@ class TradeHeader(models.Model):
     # Campos calculados
     settlements_count = fields.Integer(
         compute='_compute_settlements_count',
-        string='Cantidad de Cabeceras de Liquidaciones'
+        string='Cantidad de Cabeceras de Liquidaciones',
+        store=True
+    )
+    processed_settlements_count = fields.Integer(
+        compute='_compute_settlements_count',
+        string='Cabeceras de Liquidaciones Procesadas',
+        store=True
     )
 
+    _sql_constraints = [
+        (
+            'file_checksum_unique',
+            'UNIQUE(file_checksum)',
+            'El archivo ya fue importado en otra Cabecera de Comercio.'
+        ),
+    ]
+
     # Metodos Base
     def unlink(self):
         """
@@ -90,16 +122,45 @@ class TradeHeader(models.Model):
                 'si tienen "Extractos Bancarios" relacionados. Primero borre los extractos'
             )
         if self.state != 'draft':
-            self.settlement_header_ids.mapped('transaction_detail_ids').write({
+            transaction_detail_ids = self._without_tracking().settlement_header_ids.mapped('transaction_detail_ids')
+            transaction_detail_ids.write({
                 'processed': False
             })
+            if self.external_bank_config_id.import_without_tracking:
+                self.message_post(body=f'Pasada a borrador: {len(transaction_detail_ids)} transacciones desmarcadas')
 
     # Metodos Depends
-    @api.depends('settlement_header_ids')
+    @api.depends('settlement_header_ids', 'settlement_header_ids.state')
     def _compute_settlements_count(self):
-        """Calcula el número de 'Cabecera de Liquidaciones' relacionados"""
+        """
+        Cuenta las 'Cabecera de Liquidaciones' relacionadas y las procesadas con un único 'read_group' por lote
+        de cabeceras de comercio
+        """
+        settlements_counts, processed_counts = {}, {}
+        trade_header_ids = [record.id for record in self if isinstance(record.id, int)]
+        if trade_header_ids:
+            SettlementHeader = self.env['settlement.header']
+            SettlementHeader.flush(['trade_header_id', 'state'])
+            for group in SettlementHeader.read_group(
+                domain=[('trade_header_id', 'in', trade_header_ids)],
+                fields=['trade_header_id', 'state'],
+                groupby=['trade_header_id', 'state'],
+                lazy=False
+            ):
+                trade_header_id = group['trade_header_id'][0]
+                settlements_counts[trade_header_id] = settlements_counts.get(trade_header_id, 0) + group['__count']
+                if group['state'] == 'processed':
+                    processed_counts[trade_header_id] = group['__count']
         for record in self:
-            record.settlements_count = len(record.settlement_header_ids)
+            if isinstance(record.id, int):
+                record.settlements_count = settlements_counts.get(record.id, 0)
+                record.processed_settlements_count = processed_counts.get(record.id, 0)
+            else:
+                # Registros nuevos (onchange): las liquidaciones solo están en memoria
+                record.settlements_count = len(record.settlement_header_ids)
+                record.processed_settlements_count = len(
+                    record.settlement_header_ids.filtered(lambda settlement: settlement.state == 'processed')
+                )
 
     @api.depends('name', 'create_date')
     def _compute_display_filename(self):
@@ -109,15 +170,15 @@ class TradeHeader(models.Model):
                 date_str = fields.Datetime.from_string(record.create_date).strftime('%Y%m%d')
                 record.filename_external_statement_view = f"{record.name}_{date_str}_{record.filename_external_statement or ''}"
 
-    @api.depends('settlement_header_ids', 'settlement_header_ids.state')
+    @api.depends('settlements_count', 'processed_settlements_count')
     def _compute_state(self):
-        """Calcula el estado basado en las 'Cabecera de Liquidaciones' hijas"""
+        """Calcula el estado a partir de la cantidad de 'Cabecera de Liquidaciones' y de las procesadas"""
         for record in self:
-            if not record.settlement_header_ids:
+            if not record.settlements_count:
                 record.state = 'draft'
-            elif all(settlement.state == 'processed' for settlement in record.settlement_header_ids):
+            elif record.processed_settlements_count == record.settlements_count:
                 record.state = 'processed'
-            elif any(settlement.state == 'processed' for settlement in record.settlement_header_ids):
+            elif record.processed_settlements_count:
                 record.state = 'partial'
             else:
                 record.state = 'draft'
@@ -179,32 +240,55 @@ class TradeHeader(models.Model):
         """
         self._generate_bank_statement_validations()
 
-        statement_ids = []
-        settlement_numbers = self.env['transaction.detail'].read_group(
-            domain=self._get_transaction_detail_domain(),
-            fields=['settlement_number'],
-            groupby=['settlement_number'],
-            lazy=False
-        )
+        start = time.time()
+        statement_ids = self._without_tracking()._generate_bank_statements()
+        if self.external_bank_config_id.import_without_tracking:
+            self._post_generation_summary(statement_ids, time.time() - start)
+
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Extractos Bancarios',
+            'res_model': 'account.bank.statement',
+            'view_mode': 'tree,form',
+            'target': 'current',
+            'domain': [('id', 'in', statement_ids)],
+            'context': {
+                'default_trade_header_id': self.id,
+            },
+        }
+
+    def _generate_bank_statements(self):
+        """
+        Crea los extractos bancarios (uno por número de liquidación), sus lineas y trailers de impuestos.
+        Las transacciones se buscan una sola vez y se agrupan en memoria; los extractos y las lineas de cada
+        extracto se crean con un único 'create' y las transacciones se marcan como procesadas con un único
+        'write'. Devuelve los ids de los extractos
+        """
+        TransactionDetail = self.env['transaction.detail']
+        transaction_details = TransactionDetail.search(self._get_transaction_detail_domain())
+        transactions_by_settlement = {}
+        for transaction_detail in transaction_details:
+            transactions_by_settlement.setdefault(transaction_detail.settlement_number, []).append(transaction_detail)
+        # Mismo orden que el 'read_group' por número de liquidación
+        settlement_numbers = sorted(transactions_by_settlement, key=lambda number: (number is False, number or ''))
         _logger.info(f'settlement_numbers -> {settlement_numbers}')
-        for settlement in settlement_numbers:
-            settlement_number = settlement.get('settlement_number')
-            transaction_detail_domain = self._get_transaction_detail_domain() + [('settlement_number', '=', settlement_number)]
-            transaction_detail_ids = self.env['transaction.detail'].search(transaction_detail_domain)
-            if not transaction_detail_ids:
-                raise UserError(
-                    f"No se encontraron transacciones para generar el extracto bancario "
-                    f"en el Trade Header {self.name} (ID: {self.id}) "
-                    f"con el número de liquidación {settlement_number}"
-                )
-            journal_id = transaction_detail_ids[0].journal_id
-            bank_statement_id: int = self.env['account.bank.statement'].create_bank_statement_by_trade_header(
-                trade_header_id=self.id, trade_header_name=self.name, settlement_number=settlement_number, journal_id=journal_id.id,
-                journal_name=journal_id.name, transaction_detail_ids=transaction_detail_ids
-            )
-            statement_ids.append(bank_statement_id)
-            for transaction_detail_id in transaction_detail_ids:
-                self.env['account.bank.statement.line'].create_bank_statement_line_by_trade_header(
+
+        BankStatement = self.env['account.bank.statement']
+        statement_vals_list = []
+        for settlement_number in settlement_numbers:
+            settlement_transactions = transactions_by_settlement[settlement_number]
+            journal_id = settlement_transactions[0].journal_id
+            statement_vals_list.append(BankStatement._prepare_bank_statement_vals_by_trade_header(
+                trade_header_id=self.id, trade_header_name=self.name, settlement_number=settlement_number,
+                journal_id=journal_id.id, journal_name=journal_id.name,
+                balance_end_real=sum(transaction.total for transaction in settlement_transactions)
+            ))
+        bank_statements = BankStatement.create(statement_vals_list)
+
+        BankStatementLine = self.env['account.bank.statement.line']
+        for settlement_number, bank_statement in zip(settlement_numbers, bank_statements):
+            BankStatementLine.create([
+                BankStatementLine._prepare_bank_statement_line_vals_by_trade_header(
                     transaction_id=transaction_detail_id.id,
                     transaction_operation_date=transaction_detail_id.operation_date,
                     transaction_cover_terminal_posnet=transaction_detail_id.cover_terminal_posnet,
@@ -212,31 +296,120 @@ class TradeHeader(models.Model):
                     transaction_card_number=transaction_detail_id.card_number,
                     transaction_coupon_posnet=transaction_detail_id.coupon_posnet,
                     transaction_total=transaction_detail_id.total,
-                    bank_statement_id=bank_statement_id
+                    bank_statement_id=bank_statement.id
                 )
-                transaction_detail_id.write({'processed': True})
+                for transaction_detail_id in transactions_by_settlement[settlement_number]
+            ])
+        # Un único 'write' recalcula una sola vez los estados de las liquidaciones y de la cabecera
+        transaction_details.write({'processed': True})
+
+        self._create_bank_statement_trailer_taxes(dict(zip(settlement_numbers, bank_statements.ids)))
+        return bank_statements.ids
 
-            grouped_trailer_taxes = self.env['settlement.trailer.tax'].read_group(
-                domain=transaction_detail_domain,
-                fields=['settlement_tax_id', 'total:sum'],
-                groupby=['settlement_tax_id']
+    def _create_bank_statement_trailer_taxes(self, statement_ids_by_settlement):
+        """
+        Crea los trailers de impuestos de los extractos con los totales de todas las liquidaciones, calculados
+        en un único 'read_group' agrupado por número de liquidación e impuesto, y un único 'create'. Si el banco
+        tiene configurada la carga masiva se insertan con COPY como upsert sobre la restricción única
+        (impuesto, extracto)
+        """
+        grouped_trailer_taxes = self.env['settlement.trailer.tax'].read_group(
+            domain=[('settlement_header_id', 'in', self.settlement_header_ids.ids)],
+            fields=['settlement_number', 'settlement_tax_id', 'total:sum'],
+            groupby=['settlement_number', 'settlement_tax_id'],
+            lazy=False
+        )
+        trailer_tax_vals_list = [
+            {
+                'settlement_tax_id': grouped_trailer_tax['settlement_tax_id'][0],
+                'total': grouped_trailer_tax['total'],
+                'statement_id': statement_ids_by_settlement[grouped_trailer_tax['settlement_number']]
+            }
+            for grouped_trailer_tax in grouped_trailer_taxes
+            if grouped_trailer_tax['total'] != 0 and grouped_trailer_tax['settlement_tax_id']
+            and grouped_trailer_tax['settlement_number'] in statement_ids_by_settlement
+        ]
+        if self.external_bank_config_id.import_bulk_copy:
+            return ExternalStatementBulkLoader(self.env).load(
+                'account.bank.settlement.trailer.tax', trailer_tax_vals_list,
+                conflict_columns=('settlement_tax_id', 'statement_id')
             )
-            for grouped_trailer_tax in grouped_trailer_taxes:
-                if grouped_trailer_tax['total'] != 0:
-                    self.env['account.bank.settlement.trailer.tax'].create({
-                        'settlement_tax_id': grouped_trailer_tax['settlement_tax_id'][0],
-                        'total': grouped_trailer_tax['total'],
-                        'statement_id': bank_statement_id
-                    })
+        return self.env['account.bank.settlement.trailer.tax'].create(trailer_tax_vals_list)
 
+    def action_download_file(self):
+        """Descarga el archivo original importado"""
+        self.ensure_one()
         return {
-            'type': 'ir.actions.act_window',
-            'name': 'Extractos Bancarios',
-            'res_model': 'account.bank.statement',
-            'view_mode': 'tree,form',
-            'target': 'current',
-            'domain': [('id', 'in', statement_ids)],
-            'context': {
-                'default_trade_header_id': self.id,
-            },
-        }
\ No newline at end of file
+            'type': 'ir.actions.act_url',
+            'url': f'/fs_external_statement/trade_header/{self.id}/file',
+            'target': 'self',
+        }
+
+    def _store_original_file(self, stream):
+        """
+        Guarda el archivo original como adjunto comprimido con gzip en el filestore, copiándolo por bloques.
+        Archivos idénticos comparten el mismo archivo en el filestore.
+        """
+        self.ensure_one()
+        Attachment = self.env['ir.attachment'].sudo()
+        temp_path, file_size = Attachment._write_stream_to_temp(stream, compress=True)
+        self.file_attachment_id = Attachment._create_from_temp(temp_path, {
+            'name': f'{self.filename_external_statement}.gz',
+            'res_model': self._name,
+            'res_id': self.id,
+            'mimetype': 'application/gzip',
+        })
+        _logger.info(
+            f'{self.filename_external_statement}: archivo original guardado '
+            f'({file_size} bytes, {self.file_attachment_id.file_size} comprimido)'
+        )
+
+    def _open_original_file(self):
+        """Abre el archivo original descomprimiéndolo por bloques, sin cargarlo en el cache del ORM"""
+        self.ensure_one()
+        if not self.file_attachment_id:
+            raise UserError(f'La Cabecera de Comercio "{self.name}" no tiene el archivo original')
+        return self.file_attachment_id.sudo()._open_stream(compressed=True)
+
+    def _without_tracking(self):
+        """
+        Devuelve el registro en un contexto sin seguimiento si la configuración del banco lo indica, para
+        que los registros creados o procesados por el sistema no generen mensajes por registro
+        """
+        if self.external_bank_config_id.import_without_tracking:
+            return self.with_context(tracking_disable=True)
+        return self
+
+    def _post_import_summary(self, duration):
+        """Publica un único mensaje con el resumen de la importación del archivo"""
+        self.ensure_one()
+        transactions = self.env['transaction.detail'].read_group(
+            domain=self._get_transaction_detail_domain(),
+            fields=['total:sum'],
+            groupby=[]
+        )
+        transactions_count = transactions[0]['__count'] if transactions else 0
+        transactions_total = (transactions[0]['total'] if transactions else 0.0) or 0.0
+        trailers_count = self.env['settlement.trailer.tax'].search_count(self._get_transaction_detail_domain())
+        self.message_post(body=(
+            f'<p>Importación del archivo <b>{self.filename_external_statement}</b> finalizada en {duration:.1f} s</p>'
+            f'<ul>'
+            f'<li>Liquidaciones: {len(self.settlement_header_ids)}</li>'
+            f'<li>Transacciones: {transactions_count} (total {transactions_total:.2f})</li>'
+            f'<li>Trailers de impuestos: {trailers_count}</li>'
+            f'</ul>'
+        ))
+
+    def _post_generation_summary(self, statement_ids, duration):
+        """Publica un único mensaje con el resumen de la generación de extractos"""
+        self.ensure_one()
+        processed_count = self.env['transaction.detail'].search_count(
+            self._get_transaction_detail_domain() + [('processed', '=', True)]
+        )
+        self.message_post(body=(
+            f'<p>Extractos bancarios generados en {duration:.1f} s</p>'
+            f'<ul>'
+            f'<li>Extractos: {len(statement_ids)}</li>'
+            f'<li>Transacciones procesadas: {processed_count}</li>'
+            f'</ul>'
+        ))
\ No newline at end of file
@@ -0,0 +1 @@
+from . import test_file_processor, test_import, test_trade_header
@@ -0,0 +1,155 @@
+from odoo.modules.module import get_module_resource
+from odoo.tests.common import TransactionCase
+import base64
+
+# Archivos de ejemplo incluidos en 'tests/data'
+SAMPLE_TXT = '30717267024-08-05-2025.txt'
+SAMPLE_XLSX = 'cabal_liquidacion_diaria.xlsx'
+
+
+class ExternalStatementCommon(TransactionCase):
+    """
+    Base de los tests: una configuración de banco para el .txt de ejemplo (Prisma) y otra para el .xlsx de
+    ejemplo (Cabal), con los metodos de pago y el diario necesarios para importarlos.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.journal = self.env['account.journal'].create({
+            'name': 'Tarjetas (test)',
+            'code': 'TTST',
+            'type': 'general',
+        })
+        self.env['external.statement.payment.methods'].create([
+            {'name': 'C', 'description': 'T.Crédito', 'journal_id': self.journal.id},
+            {'name': 'CABAL DEBITO', 'description': 'Cabal Débito', 'journal_id': self.journal.id},
+        ])
+        self.txt_config = self._create_txt_config()
+        self.xlsx_config = self._create_xlsx_config()
+
+    def _get_field(self, model, name):
+        return self.env['ir.model.fields']._get(model, name)
+
+    def _read_sample(self, filename):
+        """Devuelve el contenido en base64 de un archivo de ejemplo"""
+        with open(get_module_resource('fs_external_statement', 'tests', 'data', filename), 'rb') as sample:
+            return base64.b64encode(sample.read())
+
+    def _create_txt_config(self):
+        """
+        Configuración del .txt de ejemplo: la cabecera de comercio en la línea '1', las liquidaciones en las
+        líneas '2', las transacciones en las '3' y un impuesto en los trailers '8'
+        """
+        config = self.env['external.bank.config'].create({'name': 'Prisma (test)'})
+        self.env['trade.header.config'].create({
+            'external_bank_config_id': config.id,
+            'field_type': 'txt',
+            'field_config_ids': [(0, 0, {
+                'destination_field_id': self._get_field('trade.header', 'name').id,
+                'start_with': '1', 'starting_position': 1, 'end_position': 16,
+            })],
+        })
+        self.env['settlement.header.config'].create({
+            'external_bank_config_id': config.id,
+            'field_type': 'txt',
+            'search_type': 'txt_sw',
+            'field_config_ids': [(0, 0, {
+                'destination_field_id': self._get_field('settlement.header', name).id,
+                'start_with': '2', 'starting_position': starting_position, 'end_position': end_position,
+            }) for name, starting_position, end_position in (
+                ('name', 54, 61), ('settlement_number', 54, 61), ('product', 1, 2)
+            )],
+        })
+        self.env['transaction.detail.config'].create({
+            'external_bank_config_id': config.id,
+            'field_type': 'txt',
+            'search_type': 'txt_sw',
+            'field_config_ids': [(0, 0, {
+                'destination_field_id': self._get_field('transaction.detail', name).id,
+                'start_with': '3', 'starting_position': starting_position, 'end_position': end_position,
+            }) for name, starting_position, end_position in (('settlement_number', 54, 61), ('total', 103, 116))],
+        })
+        self.txt_tax = self.env['settlement.tax'].create({
+            'name': 'IVA Aranceles (test)',
+            'type': 'net',
+            'field_type': 'tax',
+            'start_with': '8',
+            'settlement_tax_line_ids': [(0, 0, {'starting_position': 63, 'long': 14, 'decimals_amount': 2})],
+        })
+        self.env['settlement.tax.config'].create({
+            'external_bank_config_id': config.id,
+            'field_type': 'txt',
+            'search_type': 'txt_sw',
+            'field_config_ids': [(0, 0, {
+                'name': 'Liquidación (test)',
+                'type': 'net',
+                'field_type': 'base',
+                'destination_field_id': self._get_field('settlement.trailer.tax', 'settlement_number').id,
+                'start_with': '8', 'starting_position': 54, 'end_position': 61,
+            }), (4, self.txt_tax.id)],
+        })
+        return config
+
+    def _create_xlsx_config(self):
+        """
+        Configuración del .xlsx de ejemplo: una única liquidación con el número en la celda fija, sus
+        transacciones por la columna 'LIQUIDACION' y los impuestos buscados por su nombre
+        """
+        config = self.env['external.bank.config'].create({'name': 'Cabal (test)'})
+        self.env['trade.header.config'].create({
+            'external_bank_config_id': config.id,
+            'field_type': 'xlsx',
+            'field_config_ids': [(0, 0, {
+                'destination_field_id': self._get_field('trade.header', name).id, 'row': 2, 'col': 1,
+            }) for name in ('name', 'commerce_number')],
+        })
+        self.env['settlement.header.config'].create({
+            'external_bank_config_id': config.id,
+            'field_type': 'xlsx',
+            'search_type': 'excel_rc',
+            'field_config_ids': [(0, 0, {
+                'destination_field_id': self._get_field('settlement.header', name).id, 'row': row, 'col': col,
+            }) for name, row, col in (('name', 2, 2), ('settlement_number', 2, 2), ('product', 7, 1))],
+        })
+        self.env['transaction.detail.config'].create({
+            'external_bank_config_id': config.id,
+            'field_type': 'xlsx',
+            'search_type': 'excel_fixed_liquidation',
+            'field_config_ids': [(0, 0, {
+                'destination_field_id': self._get_field('transaction.detail', 'settlement_number').id,
+                'col': 9, 'is_liquidation_number': True, 'liquidation_type': 'row',
+            }), (0, 0, {
+                'destination_field_id': self._get_field('transaction.detail', 'total').id, 'col': 8,
+            })],
+        })
+        self.xlsx_tax = self.env['settlement.tax'].create({
+            'name': 'Percepciones de IVA (test)',
+            'type': 'net',
+            'field_type': 'tax',
+            'settlement_tax_line_ids': [(0, 0, {
+                'tax_name': tax_name, 'positions_amount': 2, 'direction': 'right',
+            }) for tax_name in ('PERCEPCION DE IVA RG3337', 'IVA ALÍCUOTA GENERAL 21')],
+        })
+        self.env['settlement.tax.config'].create({
+            'external_bank_config_id': config.id,
+            'field_type': 'xlsx',
+            'search_type': 'excel_tax_name',
+            'field_config_ids': [(0, 0, {
+                'name': 'Liquidación (test)',
+                'type': 'net',
+                'field_type': 'base',
+                'destination_field_id': self._get_field('settlement.trailer.tax', 'settlement_number').id,
+                'row': 2, 'col': 2,
+            }), (4, self.xlsx_tax.id)],
+        })
+        return config
+
+    def _import_sample(self, config, filename, field_type):
+        """Importa un archivo de ejemplo con el wizard y devuelve la 'Cabecera de Comercio' creada"""
+        wizard = self.env['import.external_statement.wizard'].create({
+            'file_external_statement': self._read_sample(filename),
+            'filename_external_statement': filename,
+            'external_bank_config_id': config.id,
+            'field_type': field_type,
+        })
+        return self.env['trade.header'].browse(wizard.action_import()['res_id'])
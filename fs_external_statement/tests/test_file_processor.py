@@ -0,0 +1,73 @@
+from odoo.tests import tagged
+from .common import ExternalStatementCommon, SAMPLE_TXT, SAMPLE_XLSX
+from ..utils.file_processor import ExternalStatementFileProcessor
+
+
+@tagged('post_install', '-at_install')
+class TestFileProcessor(ExternalStatementCommon):
+
+    def _process_txt(self, txt_parse_mode):
+        """Parsea el .txt de ejemplo con el modo indicado y devuelve los datos como en 'process_file'"""
+        self.txt_config.txt_parse_mode = txt_parse_mode
+        file_processor = ExternalStatementFileProcessor(self.env)
+        if txt_parse_mode != 'streaming':
+            return file_processor.process_file(self._read_sample(SAMPLE_TXT), SAMPLE_TXT, self.txt_config, 'txt')
+        data = {'settlements': [], 'transactions': [], 'trailers': []}
+        for section, values in file_processor.iter_process_file(
+            self._read_sample(SAMPLE_TXT), SAMPLE_TXT, self.txt_config, 'txt'
+        ):
+            if section == 'trade_header':
+                data[section] = values
+            else:
+                data[section].append(values)
+        return data
+
+    def test_txt_single_pass(self):
+        data = self._process_txt('single_pass')
+        self.assertEqual(data['trade_header'], {'filename_external_statement': SAMPLE_TXT, 'name': 'CL586D22831633H'})
+        self.assertEqual(len(data['settlements']), 10)
+        self.assertEqual(len(data['transactions']), 86)
+        self.assertEqual(len(data['trailers']), 10)
+        self.assertEqual(
+            data['settlements'][0], {'name': '0611098', 'settlement_number': '0611098', 'product': 'C'}
+        )
+        self.assertEqual(data['transactions'][0], {'settlement_number': '0611098', 'total': '0000000620000'})
+        self.assertEqual(data['trailers'][0]['settlement_number'], '0611098')
+        self.assertEqual(data['trailers'][0]['settlement_tax_id'], self.txt_tax.id)
+        self.assertAlmostEqual(data['trailers'][0]['total'], 10.42)
+
+    def test_txt_modes_match(self):
+        """Los tres modos de parseo de .txt devuelven los mismos datos para el mismo archivo"""
+        single_pass = self._process_txt('single_pass')
+        self.assertEqual(self._process_txt('vectorized'), single_pass)
+        self.assertEqual(self._process_txt('streaming'), single_pass)
+
+    def test_xlsx(self):
+        data = ExternalStatementFileProcessor(self.env).process_file(
+            self._read_sample(SAMPLE_XLSX), SAMPLE_XLSX, self.xlsx_config, 'xlsx'
+        )
+        self.assertEqual(data['trade_header'], {
+            'filename_external_statement': SAMPLE_XLSX, 'name': '45787390005', 'commerce_number': '45787390005',
+        })
+        self.assertEqual(data['settlements'], [
+            {'name': '502178', 'settlement_number': '502178', 'product': 'CABAL DEBITO'}
+        ])
+        # Las filas de subtotales no tienen número de liquidación y quedan afuera
+        self.assertEqual(len(data['transactions']), 37)
+        self.assertEqual(data['transactions'][0], {'settlement_number': '502178', 'total': '55.056,00'})
+        self.assertEqual(len(data['trailers']), 1)
+        self.assertEqual(data['trailers'][0]['settlement_tax_id'], self.xlsx_tax.id)
+        self.assertAlmostEqual(data['trailers'][0]['total'], -5166.90)
+
+    def test_date_column_mixed_offsets(self):
+        """Una columna con fechas de distintos husos horarios se parsea valor por valor sin fallar"""
+        import pandas as pd
+
+        column = pd.Series([
+            '2025-05-01T10:00:00.000-0300', '2025-05-02T10:00:00.000+0000', 'Sub Total', None
+        ], dtype=object)
+        mask, dates = ExternalStatementFileProcessor(self.env)._parse_date_column(
+            column, '%Y-%m-%dT%H:%M:%S.%f%z', '%Y-%m-%d'
+        )
+        self.assertEqual(mask.tolist(), [True, True, False, False])
+        self.assertEqual(dates[mask].tolist(), ['2025-05-01', '2025-05-02'])
@@ -0,0 +1,96 @@
+from psycopg2 import IntegrityError
+from odoo.exceptions import UserError, ValidationError
+from odoo.tests import tagged
+from odoo.tools import mute_logger
+from .common import ExternalStatementCommon, SAMPLE_TXT, SAMPLE_XLSX
+
+
+@tagged('post_install', '-at_install')
+class TestImport(ExternalStatementCommon):
+
+    def _get_imported_values(self, trade_header):
+        """Valores importados de la cabecera, comparables entre dos importaciones del mismo archivo"""
+        settlements = trade_header.settlement_header_ids
+        return {
+            'settlements': sorted(
+                (s.settlement_number, s.name, s.product, s.journal_id.id, s.total_amount, s.transactions_count)
+                for s in settlements
+            ),
+            'transactions': sorted(
+                (t.settlement_number, t.total, t.journal_id.id, t.processed)
+                for t in settlements.mapped('transaction_detail_ids')
+            ),
+            'trailers': sorted(
+                (t.settlement_number, t.settlement_tax_id.id, t.total, t.settlement_header_id.settlement_number)
+                for t in settlements.mapped('settlement_trailer_tax_ids')
+            ),
+        }
+
+    def _check_txt_import(self, trade_header):
+        self.assertEqual(trade_header.name, 'CL586D22831633H')
+        self.assertEqual(trade_header.settlements_count, 10)
+        self.assertEqual(len(trade_header.settlement_header_ids.mapped('transaction_detail_ids')), 86)
+        self.assertEqual(len(trade_header.settlement_header_ids.mapped('settlement_trailer_tax_ids')), 10)
+        self.assertTrue(trade_header.file_checksum)
+        self.assertTrue(trade_header.file_attachment_id)
+
+    def test_import_txt_modes(self):
+        """El wizard importa lo mismo con cualquiera de los modos de parseo de .txt"""
+        imported_values = {}
+        for txt_parse_mode in ('single_pass', 'vectorized', 'streaming'):
+            self.txt_config.txt_parse_mode = txt_parse_mode
+            trade_header = self._import_sample(self.txt_config, SAMPLE_TXT, 'txt')
+            self._check_txt_import(trade_header)
+            imported_values[txt_parse_mode] = self._get_imported_values(trade_header)
+            # El checksum impide importar el mismo archivo dos veces
+            trade_header.unlink()
+        self.assertEqual(imported_values['vectorized'], imported_values['single_pass'])
+        self.assertEqual(imported_values['streaming'], imported_values['single_pass'])
+
+    def test_import_xlsx(self):
+        trade_header = self._import_sample(self.xlsx_config, SAMPLE_XLSX, 'xlsx')
+        self.assertEqual(trade_header.name, '45787390005')
+        self.assertEqual(trade_header.commerce_number, '45787390005')
+        settlement = trade_header.settlement_header_ids
+        self.assertEqual(settlement.settlement_number, '502178')
+        self.assertEqual(settlement.journal_id, self.journal)
+        self.assertEqual(settlement.transactions_count, 37)
+        self.assertAlmostEqual(settlement.total_amount, 2144124.60, places=2)
+        self.assertEqual(settlement.settlement_trailer_tax_ids.settlement_tax_id, self.xlsx_tax)
+        self.assertAlmostEqual(settlement.settlement_trailer_tax_ids.total, -5166.90, places=2)
+
+    def test_import_duplicate_file(self):
+        self._import_sample(self.txt_config, SAMPLE_TXT, 'txt')
+        with self.assertRaises(UserError):
+            self._import_sample(self.txt_config, SAMPLE_TXT, 'txt')
+
+    def test_bulk_copy_matches_orm(self):
+        """La carga masiva con COPY crea los mismos registros, relacionados y calculados, que el ORM"""
+        for txt_parse_mode in ('single_pass', 'streaming'):
+            self.txt_config.write({'txt_parse_mode': txt_parse_mode, 'import_bulk_copy': False})
+            trade_header = self._import_sample(self.txt_config, SAMPLE_TXT, 'txt')
+            orm_values = self._get_imported_values(trade_header)
+            trade_header.unlink()
+
+            self.txt_config.import_bulk_copy = True
+            trade_header = self._import_sample(self.txt_config, SAMPLE_TXT, 'txt')
+            self._check_txt_import(trade_header)
+            self.assertEqual(self._get_imported_values(trade_header), orm_values)
+            trade_header.unlink()
+
+    def test_bulk_copy_duplicate_trailer(self):
+        """Con COPY un trailer repetido se rechaza con el mensaje de la restricción, igual que con el ORM"""
+        trade_header = self._import_sample(self.txt_config, SAMPLE_TXT, 'txt')
+        trailer = trade_header.settlement_header_ids.mapped('settlement_trailer_tax_ids')[0]
+        vals_list = [{
+            'settlement_tax_id': trailer.settlement_tax_id.id,
+            'settlement_number': trailer.settlement_number,
+            'total': trailer.total,
+            'settlement_header_id': trailer.settlement_header_id.id,
+        }]
+        with self.assertRaises(IntegrityError), mute_logger('odoo.sql_db'), self.cr.savepoint():
+            self.env['settlement.trailer.tax'].create([dict(vals) for vals in vals_list])
+        self.txt_config.import_bulk_copy = True
+        wizard = self.env['import.external_statement.wizard'].new({'external_bank_config_id': self.txt_config.id})
+        with self.assertRaisesRegex(ValidationError, 'El impuesto ya existe en esta cabecera de liquidación'):
+            wizard._create_records('settlement.trailer.tax', vals_list)
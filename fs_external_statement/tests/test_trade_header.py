@@ -0,0 +1,48 @@
+from odoo.tests import tagged
+from .common import ExternalStatementCommon, SAMPLE_TXT
+
+
+@tagged('post_install', '-at_install')
+class TestTradeHeader(ExternalStatementCommon):
+
+    def test_state(self):
+        """El estado de la cabecera sigue a las transacciones procesadas de sus liquidaciones"""
+        trade_header = self._import_sample(self.txt_config, SAMPLE_TXT, 'txt')
+        self.assertEqual(trade_header.state, 'draft')
+        self.assertEqual(trade_header.processed_settlements_count, 0)
+
+        settlement = trade_header.settlement_header_ids[0]
+        settlement.transaction_detail_ids.write({'processed': True})
+        self.assertEqual(settlement.state, 'processed')
+        self.assertEqual(trade_header.state, 'partial')
+        self.assertEqual(trade_header.processed_settlements_count, 1)
+
+        trade_header.settlement_header_ids.mapped('transaction_detail_ids').write({'processed': True})
+        self.assertEqual(trade_header.state, 'processed')
+        self.assertEqual(trade_header.processed_settlements_count, 10)
+
+        trade_header.set_draft()
+        self.assertEqual(trade_header.state, 'draft')
+        self.assertEqual(trade_header.processed_settlements_count, 0)
+
+    def test_generate_bank_statements(self):
+        """Generar los extractos marca todas las transacciones como procesadas y la cabecera como realizada"""
+        bank_journal = self.env['account.journal'].search([
+            ('type', '=', 'bank'), ('company_id', '=', self.env.company.id)
+        ], limit=1)
+        if not bank_journal:
+            self.skipTest('La compañía no tiene un diario de banco')
+        self.env['external.statement.payment.methods'].search([('name', '=', 'C')]).journal_id = bank_journal
+
+        for import_bulk_copy in (False, True):
+            self.txt_config.import_bulk_copy = import_bulk_copy
+            trade_header = self._import_sample(self.txt_config, SAMPLE_TXT, 'txt')
+            trade_header.action_generate_bank_statement()
+            self.assertEqual(trade_header.state, 'processed')
+            self.assertEqual(len(trade_header.bank_statement_ids), 10)
+            self.assertEqual(len(trade_header.bank_statement_ids.mapped('line_ids')), 86)
+            self.assertEqual(len(trade_header.bank_statement_ids.mapped('account_bank_statement_trailer_tax_ids')), 10)
+            # Se borran los extractos y la cabecera para volver a importar el mismo archivo
+            trade_header.bank_statement_ids.unlink()
+            trade_header.set_draft()
+            trade_header.unlink()
@@ -0,0 +1,182 @@
+import io
+import logging
+import psycopg2
+from odoo.exceptions import ValidationError
+from odoo.models import MAGIC_COLUMNS
+
+_logger = logging.getLogger(__name__)
+
+
+class ExternalStatementBulkLoader:
+    """
+    Carga masiva de registros importados ('transaction.detail', 'settlement.trailer.tax') con COPY.
+
+    Las filas se copian a una tabla temporal y se insertan en la tabla del modelo con un único
+    INSERT ... SELECT que completa los campos relacionados almacenados con un JOIN. Al no pasar por el
+    'create' del ORM no se generan mensajes ni seguimiento del chatter; los campos calculados del modelo y
+    los que dependen de él se marcan para recalcularse una sola vez.
+    """
+
+    def __init__(self, env):
+        self.env = env
+
+    def load(self, model_name, vals_list, conflict_columns=None):
+        """
+        Inserta 'vals_list' en el modelo y devuelve el recordset creado. Con 'conflict_columns' (las columnas de
+        una restricción UNIQUE del modelo) la carga es un upsert: las filas que ya existen se actualizan en lugar
+        de fallar, por lo que volver a cargar los mismos registros no los duplica. Devuelve también los
+        registros actualizados. Filas repetidas dentro de la misma carga son un error, como en el ORM.
+        """
+        Model = self.env[model_name]
+        if not vals_list:
+            return Model
+
+        # Los registros padre (p. ej. las liquidaciones recién creadas) tienen que estar en la base
+        Model.flush()
+
+        if conflict_columns:
+            self._check_duplicate_keys(Model, vals_list, conflict_columns)
+        columns = self._get_columns(Model, vals_list)
+        related = self._get_related_columns(Model, columns)
+        staging_table = f'{Model._table}_bulk_staging'
+        cr = self.env.cr
+
+        cr.execute(f'DROP TABLE IF EXISTS "{staging_table}"')
+        cr.execute(
+            f'CREATE TEMP TABLE "{staging_table}" AS SELECT {", ".join(self._quote(c) for c in columns)} '
+            f'FROM "{Model._table}" WITH NO DATA'
+        )
+        cr.copy_expert(
+            f'COPY "{staging_table}" ({", ".join(self._quote(c) for c in columns)}) FROM STDIN',
+            self._to_copy_buffer(Model, columns, vals_list)
+        )
+
+        joins, select_related = [], []
+        for index, (many2one, comodel_table) in enumerate(sorted({(m, t) for _, m, t, _ in related})):
+            joins.append(
+                f'LEFT JOIN "{comodel_table}" j{index} ON j{index}.id = s.{self._quote(many2one)}'
+            )
+            for name, related_many2one, related_table, related_column in related:
+                if (related_many2one, related_table) == (many2one, comodel_table):
+                    select_related.append((name, f'j{index}.{self._quote(related_column)}'))
+
+        insert_columns = columns + [name for name, _ in select_related] + [
+            'create_uid', 'create_date', 'write_uid', 'write_date'
+        ]
+        select_columns = [f's.{self._quote(c)}' for c in columns] + [expr for _, expr in select_related] + [
+            '%(uid)s', "(now() at time zone 'UTC')", '%(uid)s', "(now() at time zone 'UTC')"
+        ]
+        on_conflict = ''
+        if conflict_columns:
+            on_conflict = (
+                f' ON CONFLICT ({", ".join(self._quote(c) for c in conflict_columns)}) DO UPDATE SET ' + ", ".join(
+                    f'{self._quote(c)} = EXCLUDED.{self._quote(c)}' for c in insert_columns
+                    if c not in conflict_columns and c not in ('create_uid', 'create_date')
+                )
+            )
+        try:
+            with cr.savepoint():
+                cr.execute(
+                    f'INSERT INTO "{Model._table}" ({", ".join(self._quote(c) for c in insert_columns)}) '
+                    f'SELECT {", ".join(select_columns)} FROM "{staging_table}" s {" ".join(joins)}'
+                    f'{on_conflict} RETURNING id',
+                    {'uid': self.env.uid}
+                )
+                records = Model.browse([row[0] for row in cr.fetchall()])
+        except psycopg2.IntegrityError as error:
+            raise self._translate_integrity_error(Model, error) from error
+        cr.execute(f'DROP TABLE "{staging_table}"')
+        _logger.info(f'{model_name}: {len(records)} registros cargados con COPY')
+
+        # Los one2many de los padres pueden estar en cache sin los registros nuevos
+        Model.invalidate_cache()
+        for name, field in Model._fields.items():
+            if field.store and field.compute and not field.related:
+                self.env.add_to_compute(field, records)
+        records.modified(insert_columns, create=True)
+        # Las restricciones python del modelo se validan igual que en el 'create'
+        records._validate_fields(insert_columns)
+        return records
+
+    def _check_duplicate_keys(self, Model, vals_list, conflict_columns):
+        """
+        Un upsert solo actualiza filas que ya están en la base: dos filas con la misma clave en la misma carga son
+        un error, igual que en el 'create' del ORM, en lugar de quedarse con la última
+        """
+        keys = set()
+        for vals in vals_list:
+            key = tuple(vals.get(c) for c in conflict_columns)
+            if key in keys and all(value for value in key):
+                raise ValidationError(self._get_unique_constraint_message(Model, conflict_columns))
+            keys.add(key)
+
+    def _get_unique_constraint_message(self, Model, columns):
+        """Mensaje de la restricción UNIQUE del modelo sobre 'columns'"""
+        definition = f'UNIQUE({", ".join(columns)})'.replace(' ', '')
+        for _name, constraint, message in Model._sql_constraints:
+            if constraint.replace(' ', '') == definition:
+                return message
+        return f'Registros duplicados en "{Model._description}" para {", ".join(columns)}'
+
+    def _translate_integrity_error(self, Model, error):
+        """Convierte la violación de una restricción SQL del modelo en un error con su mensaje"""
+        for name, _definition, message in Model._sql_constraints:
+            if f'{Model._table}_{name}' in str(error):
+                return ValidationError(message)
+        return ValidationError(f'No se pudieron cargar los registros de "{Model._description}": {error}')
+
+    def _get_columns(self, Model, vals_list):
+        """Columnas a copiar: las de 'vals_list' más los valores por defecto de los campos no informados"""
+        columns = list(vals_list[0])
+        defaults = Model.default_get([
+            name for name, field in Model._fields.items()
+            if field.store and field.column_type and not field.compute and not field.related
+            and name not in columns and name not in MAGIC_COLUMNS
+        ])
+        for name, value in defaults.items():
+            columns.append(name)
+            for vals in vals_list:
+                vals.setdefault(name, value)
+        return columns
+
+    def _get_related_columns(self, Model, columns):
+        """
+        Devuelve los campos relacionados almacenados que se resuelven con un JOIN a partir de un many2one
+        copiado: [(campo, many2one, tabla del comodelo, columna del comodelo)]
+        """
+        related = []
+        for name, field in Model._fields.items():
+            if not (field.store and field.related) or name in columns:
+                continue
+            path = field.related.split('.') if isinstance(field.related, str) else field.related
+            if len(path) != 2 or path[0] not in columns:
+                continue
+            comodel = self.env[Model._fields[path[0]].comodel_name]
+            if comodel._fields[path[1]].store:
+                related.append((name, path[0], comodel._table, path[1]))
+        return related
+
+    def _to_copy_buffer(self, Model, columns, vals_list):
+        """Arma el contenido de COPY en formato texto, convirtiendo cada valor como lo haría el ORM"""
+        fields_list = [Model._fields[c] for c in columns]
+        buffer = io.StringIO()
+        for vals in vals_list:
+            buffer.write('\t'.join(
+                self._copy_value(field.convert_to_column(field.convert_to_cache(vals.get(field.name), Model), Model))
+                for field in fields_list
+            ))
+            buffer.write('\n')
+        buffer.seek(0)
+        return buffer
+
+    def _copy_value(self, value):
+        """Escapa un valor para COPY en formato texto"""
+        if value is None:
+            return '\\N'
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+    def _quote(self, column):
+        """Cita un nombre de columna para SQL"""
+        return f'"{column}"'
@@ -0,0 +1,20 @@
+from collections import namedtuple
+
+# Layout compilado de un 'external.bank.config' para un tipo de archivo. Son tuplas planas, sin
+# referencias al ORM, por lo que se pueden cachear por proceso y recorrer en los bucles de parseo.
+
+FieldLayout = namedtuple('FieldLayout', [
+    'destination', 'start_with', 'line_number', 'starting_position', 'end_position', 'row', 'col',
+    'is_liquidation_number', 'liquidation_type', 'group_by', 'origin_date_format', 'dest_date_format',
+    'settlement_tax_id', 'field_type', 'tax_lines',
+], defaults=(None,) * 15)
+
+TaxLineLayout = namedtuple('TaxLineLayout', [
+    'starting_position', 'long', 'decimals_amount', 'row', 'col', 'tax_name', 'positions_amount', 'direction',
+])
+
+SectionLayout = namedtuple('SectionLayout', ['name', 'search_type', 'fields'])
+
+CompiledLayout = namedtuple('CompiledLayout', [
+    'field_type', 'trade_header', 'settlements', 'transactions', 'trailers', 'txt_parse_mode',
+])
@@ -1,12 +1,69 @@
 import base64
+import codecs
+import hashlib
+import importlib.util
 from odoo.exceptions import UserError
 import logging
-import pandas as pd
 import io
+import math
 from datetime import datetime
 
 _logger = logging.getLogger(__name__)
 
+# Tamaño de los bloques en base64 leídos en modo streaming (múltiplo de 4)
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# Máximo de registros que el modo streaming retiene en memoria a la espera de su cabecera o liquidación
+STREAM_MAX_BUFFERED_RECORDS = 100000
+
+# Celda (fila, columna) donde se encuentra el numero de liquidación en 'excel_fixed_liquidation'
+EXCEL_FIXED_LIQUIDATION_CELL = (2, 2)
+
+# Desplazamiento (fila, columna) de cada dirección en la búsqueda de impuestos por nombre ('excel_tax_name')
+TAX_NAME_DIRECTIONS = {
+    'up': (-1, 0),
+    'down': (1, 0),
+    'left': (0, -1),
+    'right': (0, 1),
+}
+
+# Marca las celdas que se omiten al convertir columnas en diccionarios (p. ej. fechas no válidas)
+SKIP_VALUE = object()
+
+
+def _parse_number(val):
+    """Convierte un importe de una celda (con símbolos de moneda y separadores locales) en float"""
+    if val is None or (isinstance(val, float) and math.isnan(val)):
+        return 0.0
+    s = str(val).strip()
+    if s == '':
+        return 0.0
+    for token in ['$', '€', 'USD', 'ARS', ' ']:
+        s = s.replace(token, '')
+    if s.count('.') > 0 and s.count(',') > 0:
+        s = s.replace('.', '').replace(',', '.')
+    else:
+        s = s.replace(',', '.')
+    try:
+        return float(s)
+    except Exception:
+        return 0.0
+
+
+def parse_statement_file(path, filename, layout):
+    """
+    Lee y parsea un archivo del disco con un layout compilado. Pensado para ejecutarse en un
+    ProcessPoolExecutor: devuelve (datos, error) en lugar de propagar la excepción al proceso principal.
+    """
+    try:
+        with open(path, 'rb') as statement_file:
+            decoded_file = statement_file.read()
+        return ExternalStatementFileProcessor(None).parse_content(decoded_file, filename, layout), None
+    except Exception as error:
+        _logger.exception(f'Error al parsear el archivo {filename}')
+        return None, error.name if isinstance(error, UserError) else str(error)
+
+
 # TODO - SEGUIR CON EL DETALLE DE LA TRANSACCIÓN
 
 class ExternalStatementFileProcessor:
@@ -15,37 +72,175 @@ class ExternalStatementFileProcessor:
     def __init__(self, env):
         self.env = env
 
-    def process_file(self, file_content, filename, external_bank_config_id, field_type):
-        """Procesa el archivo de Extractos Bancarios Externos y devuelve los datos estructurados"""
+    def process_file(self, file_content, filename, external_bank_config_id, field_type, file_checksum=None):
+        """
+        Procesa el archivo de Extractos Bancarios Externos y devuelve los datos estructurados. Si la
+        configuración del banco tiene habilitado el cache de parseo, un archivo ya parseado con el mismo
+        layout se devuelve sin parsearlo de nuevo.
+        """
         if not file_content:
             raise UserError("No se proporcionó contenido de archivo")
+        if field_type not in ('txt', 'csv', 'xls', 'xlsx'):
+            raise UserError(f"Tipo de archivo no soportado: {field_type}")
+
+        layout = external_bank_config_id._get_compiled_layout(field_type)
+
+        parse_cache = external_bank_config_id._get_parse_cache()
+        if parse_cache:
+            cache_key = parse_cache.get_key(file_checksum or self.get_file_checksum(file_content), filename, layout)
+            data = parse_cache.get(cache_key)
+            if data is not None:
+                _logger.info(f'{filename}: resultado del parseo tomado del cache')
+                return data
 
         # Decodificar contenido
         decoded_file = base64.b64decode(file_content)
+        data = self.parse_content(decoded_file, filename, layout)
+        if parse_cache:
+            parse_cache.set(cache_key, data)
+        return data
 
-        if field_type == 'txt':
+    def parse_content(self, decoded_file, filename, layout):
+        """
+        Parsea el contenido ya decodificado del archivo con un layout compilado. No accede a la base de
+        datos, por lo que puede ejecutarse en otro proceso (ver 'parse_statement_file').
+        """
+        # Las líneas unidas solo las consume el parseo .txt; en Excel/CSV se trabaja sobre el DataFrame.
+        # El parseo .txt por línea no necesita pandas: el DataFrame solo se arma en el modo vectorizado
+        lines = df_lines = None
+        if layout.field_type == 'txt':
             data_str = decoded_file.decode('UTF-8')
             lines = [line for line in data_str.splitlines() if line.strip()]
-            df_lines = pd.DataFrame({'line': lines})
+            if layout.txt_parse_mode == 'vectorized':
+                import pandas as pd
+                df_lines = pd.DataFrame({'line': lines})
+        else:
+            df_lines = self._read_tabular(decoded_file, layout.field_type, self._get_excel_usecols(layout))
 
-        elif field_type == 'csv':
-            data_str = decoded_file.decode('UTF-8')
-            data_io = io.StringIO(data_str)
-            df_lines = pd.read_csv(data_io, sep=",")
-            lines = df_lines.astype(str).agg(",".join, axis=1).tolist()  # convertir filas en "líneas"
+        return self._parse_lines(lines, df_lines, filename, layout)
 
-        elif field_type in ('xls', 'xlsx'):
-            data_io = io.BytesIO(decoded_file)
-            df_lines = pd.read_excel(data_io)  # pandas decide motor según extensión y disponibilidad
-            lines = df_lines.astype(str).agg(",".join, axis=1).tolist()
+    def _read_tabular(self, decoded_file, field_type, usecols):
+        """
+        Lee un .csv/.xls/.xlsx solo con las columnas configuradas, sin inferencia de tipos (dtype=object) y
+        sin convertir celdas vacías en NaN. Las columnas se reubican en su posición original para que los
+        accesos por (fila, columna) de la configuración sigan siendo válidos.
+        """
+        import pandas as pd
 
+        read_kwargs = {'dtype': object, 'na_filter': False}
+        if field_type == 'csv':
+            def reader(**kwargs):
+                return pd.read_csv(io.BytesIO(decoded_file), sep=",", encoding='UTF-8', **read_kwargs, **kwargs)
         else:
-            raise UserError(f"Tipo de archivo no soportado: {field_type}")
-
-        return self._parse_lines(lines, df_lines, filename, external_bank_config_id, field_type)
+            engine = self._get_excel_engine()
+            def reader(**kwargs):
+                return pd.read_excel(io.BytesIO(decoded_file), engine=engine, **read_kwargs, **kwargs)
 
-    def _parse_lines(self, lines, df_lines, filename, external_bank_config_id, field_type):
+        if not usecols:
+            return reader()
+        try:
+            df_lines = reader(usecols=usecols)
+        except pd.errors.ParserError:
+            # pandas >= 2 rechaza columnas fuera de rango: se lee completo y se toman las columnas existentes
+            df_lines = reader()
+            df_lines = df_lines.iloc[:, [col for col in usecols if col < df_lines.shape[1]]]
+        # pandas < 2 solo avisa y omite las columnas fuera de rango; como 'usecols' está ordenado, las columnas
+        # devueltas son las primeras. Las faltantes quedan fuera de rango, igual que al leer la hoja completa
+        cols = usecols[:df_lines.shape[1]]
+        df_lines.columns = cols
+        return df_lines.reindex(columns=range(cols[-1] + 1)) if cols else df_lines
+
+    def _get_excel_usecols(self, layout):
+        """
+        Devuelve las columnas (base 0) referenciadas por la configuración o None si hay que leer la hoja completa,
+        como en la búsqueda de impuestos por nombre, donde la celda puede estar en cualquier columna.
+        """
+        if layout.trailers.search_type == 'excel_tax_name':
+            return None
+        cols = set()
+        for section in (layout.trade_header, layout.settlements, layout.transactions, layout.trailers):
+            for field in section.fields:
+                if field.col:
+                    cols.add(field.col - 1)
+                for tax_line in field.tax_lines or ():
+                    if tax_line.col:
+                        cols.add(tax_line.col - 1)
+        if layout.transactions.search_type == 'excel_fixed_liquidation':
+            cols.add(EXCEL_FIXED_LIQUIDATION_CELL[1] - 1)
+        return sorted(cols) or None
+
+    def _get_excel_engine(self):
+        """Usa calamine si está instalado (y pandas lo soporta); sino deja que pandas elija el motor"""
+        import pandas as pd
+
+        if importlib.util.find_spec('python_calamine') and tuple(
+                int(part) for part in pd.__version__.split('.')[:2]
+        ) >= (2, 2):
+            return 'calamine'
+        return None
+
+    def iter_process_file(self, file_content, filename, external_bank_config_id, field_type, max_buffered=None,
+                          file_checksum=None):
+        """
+        Procesa el archivo en modo streaming y produce tuplas (sección, valores), comenzando siempre por
+        la cabecera de comercio. Los .txt se decodifican y parsean de a bloques sin materializar el archivo;
+        el resto de los tipos, y también los .txt si la configuración tiene el cache de parseo habilitado,
+        pasan por 'process_file' y se entregan con la misma interfaz. Así un trabajo que se reanuda toma el
+        parseo del cache. Con 'max_buffered' se corta el parseo si la cabecera de comercio no aparece antes
+        de retener esa cantidad de registros.
+        """
+        if not file_content:
+            raise UserError("No se proporcionó contenido de archivo")
+        if field_type != 'txt' or external_bank_config_id.import_parse_cache:
+            data = self.process_file(
+                file_content, filename, external_bank_config_id, field_type, file_checksum=file_checksum
+            )
+            yield 'trade_header', data['trade_header']
+            for section in ('settlements', 'transactions', 'trailers'):
+                for values in data[section]:
+                    yield section, values
+            return
+
+        layout = external_bank_config_id._get_compiled_layout(field_type)
+        lines = self._iter_decoded_lines(self._iter_base64_chunks(file_content))
+        yield from self._iter_parse_txt(lines, filename, layout, max_buffered)
+
+    def get_file_checksum(self, file_content):
+        """Calcula el SHA-256 del archivo decodificado, por bloques y sin parsearlo"""
+        checksum = hashlib.sha256()
+        for chunk in self._iter_base64_chunks(file_content):
+            checksum.update(chunk)
+        return checksum.hexdigest()
+
+    def _iter_base64_chunks(self, file_content, chunk_size=STREAM_CHUNK_SIZE):
+        """Decodifica el contenido en base64 por bloques (el tamaño del bloque debe ser múltiplo de 4)"""
+        for start in range(0, len(file_content), chunk_size):
+            yield base64.b64decode(file_content[start:start + chunk_size])
+
+    def _iter_decoded_lines(self, chunks, encoding='UTF-8'):
+        """Convierte bloques de bytes en líneas de texto no vacías, sin acumular el archivo completo"""
+        decoder = codecs.getincrementaldecoder(encoding)()
+        pending = ''
+        for chunk in chunks:
+            lines = (pending + decoder.decode(chunk)).splitlines(True)
+            # La última línea puede estar incompleta: se retiene hasta el próximo bloque
+            pending = lines.pop() if lines else ''
+            for line in lines:
+                line = line.splitlines()[0]
+                if line.strip():
+                    yield line
+        for line in (pending + decoder.decode(b'', final=True)).splitlines():
+            if line.strip():
+                yield line
+
+    def _parse_lines(self, lines, df_lines, filename, layout):
         """Parsea las líneas del archivo y devuelve una estructura de datos"""
+        field_type = layout.field_type
+        if field_type == 'txt':
+            if layout.txt_parse_mode == 'vectorized':
+                return self._parse_lines_txt_vectorized(df_lines, filename, layout)
+            return self._parse_lines_txt(lines, filename, layout)
+
         result = {
             'trade_header': {},
             'settlements': [],
@@ -53,66 +248,310 @@ class ExternalStatementFileProcessor:
             'trailers': []
         }
 
-        result['trade_header'] = self._parse_trade_header(df_lines, filename, external_bank_config_id, field_type)
-        result['settlements'] = self._parse_settlement(df_lines, external_bank_config_id, field_type)
-        result['transactions'] = self._parse_transaction2(df_lines, external_bank_config_id, field_type) # TODO AGREGAR SI TIENE DECIMALES Y CUANTOS
-        result['trailers'] = self._parse_trailer2(df_lines, external_bank_config_id, field_type)
+        result['trade_header'] = self._parse_trade_header(df_lines, filename, layout)
+        result['settlements'] = self._parse_settlement(df_lines, layout)
+        result['transactions'] = self._parse_transaction2(df_lines, layout) # TODO AGREGAR SI TIENE DECIMALES Y CUANTOS
+        result['trailers'] = self._parse_trailer2(df_lines, layout)
         _logger.info(f'trailers -> {result["trailers"]}')
-        # last_product = None
-        # if field_type == 'txt':
-        #     for line in lines[1:]:
-        #         if line.startswith('2'):
-        #             settlement = self._parse_settlement(line)
-        #             result['settlements'].append(settlement)
-        #             last_product = settlement.get('product')
-        #         elif line.startswith('3'):
-        #             result['transactions'].append(self._parse_transaction(line))
-        #         elif line.startswith('8'):
-        #             result['trailers'].append(self._parse_trailer(line, last_product))
+        return result
 
+    def _parse_lines_txt(self, lines, filename, layout):
+        """
+        Parsea un archivo .txt de ancho fijo recorriendo sus líneas una única vez. Cada línea se enruta
+        por su prefijo de tipo de registro ('1', '2', '3', '7', '8') hacia los recortes ya compilados de
+        las secciones que la consumen, de modo que el costo crece con las líneas y no con
+        líneas x secciones x campos.
+        """
+        result = {
+            'trade_header': {},
+            'settlements': [],
+            'transactions': [],
+            'trailers': []
+        }
+        for section, values in self._iter_parse_txt(lines, filename, layout):
+            if section == 'trade_header':
+                result['trade_header'] = values
+            else:
+                result[section].append(values)
         return result
 
-    def _parse_trade_header_txt_pandas(self, trade_header_dict, trade_header_field_config_ids, df_lines):
+    def is_streamable(self, layout):
         """
-        df_lines: DataFrame con columna 'line' que contiene todas las líneas del archivo.
+        Indica si el layout se puede importar en modo streaming. Con liquidaciones por número de línea
+        ('txt_ln') la liquidación recién se completa al final del archivo, por lo que todas las transacciones
+        quedarían retenidas en memoria hasta entonces.
+        """
+        return layout.field_type == 'txt' and layout.settlements.search_type != 'txt_ln'
+
+    def _iter_parse_txt(self, lines, filename, layout, max_buffered=None):
+        """
+        Generador del parseo .txt en una pasada. Produce tuplas (sección, valores) donde la sección es
+        'trade_header', 'settlements', 'transactions' o 'trailers'. La cabecera de comercio siempre se
+        produce primero: los registros anteriores a completarla se retienen hasta ese momento.
+        """
+        router, line_number_slicers, settlement_search_type = self._build_txt_router(layout)
+
+        trade_header = {'filename_external_statement': filename}
+        trade_header_pending = {
+            start_with for entries in router.values() for start_with, section, _ in entries if section == 'trade_header'
+        }
+        trade_header_last_line = max((
+            line_number for line_number, entries in line_number_slicers.items()
+            if any(section == 'trade_header' for section, _ in entries)
+        ), default=0)
+        trade_header_sent = False
+        held_back = []
+        settlement_ln_dict = {}
+
+        for line_number, line in enumerate(lines, start=1):
+            for section, slicers in line_number_slicers.get(line_number, ()):
+                target = trade_header if section == 'trade_header' else settlement_ln_dict
+                self._apply_txt_slicers(line, slicers, target)
+
+            line_dicts = {}
+            for start_with, section, slicers in router.get(line[:1], ()):
+                if not line.startswith(start_with):
+                    continue
+                if section == 'trade_header':
+                    # La cabecera toma solo la primera línea que comienza con el caracter configurado
+                    if start_with not in trade_header_pending:
+                        continue
+                    trade_header_pending.discard(start_with)
+                    target = trade_header
+                else:
+                    target = line_dicts.setdefault(section, {})
+                self._apply_txt_slicers(line, slicers, target)
+            records = [(section, line_dict) for section, line_dict in line_dicts.items() if line_dict]
+
+            if trade_header_sent:
+                yield from records
+            elif not trade_header_pending and line_number >= trade_header_last_line:
+                _logger.info(f'trade_header_dict -> {trade_header}')
+                yield 'trade_header', trade_header
+                trade_header_sent = True
+                yield from held_back
+                held_back = []
+                yield from records
+            else:
+                held_back.extend(records)
+                if max_buffered and len(held_back) > max_buffered:
+                    raise UserError(
+                        f'No se encontró la cabecera de comercio en las primeras {line_number} líneas del archivo. '
+                        'Verifique la configuración o importe el archivo sin el modo streaming'
+                    )
+
+        if not trade_header_sent:
+            _logger.info(f'trade_header_dict -> {trade_header}')
+            yield 'trade_header', trade_header
+            yield from held_back
+        if settlement_search_type == 'txt_ln':
+            yield 'settlements', settlement_ln_dict
+
+    def _parse_lines_txt_vectorized(self, df_lines, filename, layout):
+        """
+        Variante vectorizada del parseo .txt: filtra 'df_lines' una vez por prefijo de registro con una
+        máscara booleana y arma cada columna destino con 'Series.str.slice', obteniendo un DataFrame por
+        tipo de registro en lugar de recorrer las líneas en Python.
         """
-        _logger.info(f'df_lines -> {df_lines}')
-        for field_config_id in trade_header_field_config_ids:
-            start_with = field_config_id.start_with
-            line_number = field_config_id.line_number
+        router, line_number_slicers, settlement_search_type = self._build_txt_router(layout)
+        lines = df_lines['line']
+
+        result = {
+            'trade_header': {'filename_external_statement': filename},
+            'settlements': [],
+            'transactions': [],
+            'trailers': []
+        }
+        settlement_ln_dict = {}
+        for line_number, entries in line_number_slicers.items():
+            if 1 <= line_number <= len(lines):
+                line = lines.iloc[line_number - 1]
+                for section, slicers in entries:
+                    target = result['trade_header'] if section == 'trade_header' else settlement_ln_dict
+                    self._apply_txt_slicers(line, slicers, target)
+
+        masks = {}
+        frames = {'settlements': [], 'transactions': [], 'trailers': []}
+        for entries in router.values():
+            for start_with, section, slicers in entries:
+                if start_with not in masks:
+                    masks[start_with] = lines.str.startswith(start_with)
+                block = lines[masks[start_with]]
+                if block.empty:
+                    continue
+                if section == 'trade_header':
+                    self._apply_txt_slicers(block.iloc[0], slicers, result['trade_header'])
+                else:
+                    frames[section].append(self._slice_txt_block(block, slicers))
 
-            if not start_with and not line_number:
+        for section, section_frames in frames.items():
+            result[section] = self._txt_frames_to_records(section_frames)
+        if settlement_search_type == 'txt_ln':
+            result['settlements'].append(settlement_ln_dict)
+
+        _logger.info(f'trade_header_dict -> {result["trade_header"]}')
+        return result
+
+    def _slice_txt_block(self, block, slicers):
+        """Construye el DataFrame de un tipo de registro aplicando los recortes compilados columna a columna"""
+        import pandas as pd
+
+        frame = pd.DataFrame(index=block.index)
+        for destination, starting_position, end_position, tax_lines in slicers:
+            if tax_lines is None:
+                frame[destination] = block.str.slice(starting_position, end_position)
+                continue
+            total = pd.Series(0.0, index=block.index)
+            for init, long, decimals_amount in tax_lines:
+                amount_str = block.str.slice(init, init + long - 1)
+                sign = block.str.slice(init + long - 1, init + long).eq('1') * 2 - 1
+                amount = pd.to_numeric(
+                    amount_str.str.slice(0, -decimals_amount) + '.' + amount_str.str.slice(-decimals_amount)
+                )
+                total = total + amount * sign
+            frame['settlement_tax_id'] = destination
+            frame['total'] = total
+        return frame
+
+    def _txt_frames_to_records(self, frames):
+        """Convierte los DataFrames de una sección en la lista de diccionarios que consume el wizard"""
+        import pandas as pd
+
+        if not frames:
+            return []
+        if len(frames) == 1:
+            return frames[0].to_dict('records')
+        # Varios prefijos alimentan la misma sección: se combinan por línea respetando el orden del archivo
+        merged = frames[0]
+        for frame in frames[1:]:
+            merged = frame.combine_first(merged)
+        return [
+            {key: value for key, value in record.items() if not pd.isna(value)}
+            for record in merged.sort_index().to_dict('records')
+        ]
+
+    def _apply_txt_slicers(self, line, slicers, target):
+        """
+        Aplica los recortes compilados sobre una línea. Cada recorte es (destino, inicio, fin, lineas_impuesto):
+        si tiene lineas de impuesto se calcula el total del impuesto, sino se recorta el campo.
+        """
+        for destination, starting_position, end_position, tax_lines in slicers:
+            if tax_lines is None:
+                target[destination] = line[starting_position:end_position]
+            else:
+                target.update({
+                    'settlement_tax_id': destination,
+                    'total': sum(
+                        self._parse_txt_amount(line, init, long, decimals_amount)
+                        for init, long, decimals_amount in tax_lines
+                    )
+                })
+
+    def _parse_txt_amount(self, line, init, long, decimals_amount):
+        """Obtiene un importe con signo de una línea .txt de ancho fijo"""
+        amount_str = line[init:init + long - 1]
+        # TODO: PARAMETRIZAR OBTENCION DE SIGNO
+        sign_str = line[init + long - 1:init + long]
+        sign = 1 if sign_str == '1' else -1
+        return float(f'{amount_str[:-decimals_amount]}.{amount_str[-decimals_amount:]}') * sign
+
+    def _build_txt_router(self, layout):
+        """
+        Compila el layout .txt en:
+            - router: {primer caracter: [(start_with, sección, recortes)]}
+            - line_number_slicers: {numero de linea: [(sección, recortes)]}
+            - el tipo de búsqueda de la cabecera de liquidación
+        """
+        router = {}
+        line_number_slicers = {}
+
+        def add_route(section, start_with, slicer):
+            entries = router.setdefault(start_with[:1], [])
+            for entry in entries:
+                if entry[0] == start_with and entry[1] == section:
+                    entry[2].append(slicer)
+                    return
+            entries.append((start_with, section, [slicer]))
+
+        def add_line_number(section, line_number, slicer):
+            entries = line_number_slicers.setdefault(line_number, [])
+            for entry in entries:
+                if entry[0] == section:
+                    entry[1].append(slicer)
+                    return
+            entries.append((section, [slicer]))
+
+        def check_start_with(field):
+            if not field.start_with:
                 raise UserError(
-                    f'La configuración de la linea "{field_config_id.name}" debe tener un "Numero de linea (.txt)" '
-                    f'o un "Caracter de comienzo de linea (.txt)"'
+                    f'La configuración de la linea "{field.destination}" debe tener un '
+                    f'"Caracter de comienzo de linea (.txt)"'
                 )
 
-            if start_with:
-                line_series = df_lines[df_lines['line'].str.startswith(start_with)]
-                line = line_series['line'].iloc[0] if not line_series.empty else None
+        # Cabecera de Comercio
+        for field in layout.trade_header.fields:
+            if not field.start_with and not field.line_number:
+                raise UserError(
+                    f'La configuración de la linea "{field.destination}" debe tener un "Numero de linea (.txt)" '
+                    f'o un "Caracter de comienzo de linea (.txt)"'
+                )
+            slicer = (field.destination, field.starting_position, field.end_position, None)
+            if field.start_with:
+                add_route('trade_header', field.start_with, slicer)
             else:
-                if 1 <= line_number <= len(df_lines):
-                    line = df_lines.iloc[line_number - 1]['line']
-                else:
-                    line = None
+                add_line_number('trade_header', field.line_number, slicer)
+
+        # Cabeceras de Liquidación
+        settlement_search_type = layout.settlements.search_type
+        for field in layout.settlements.fields:
+            slicer = (field.destination, field.starting_position, field.end_position, None)
+            if settlement_search_type == 'txt_sw':
+                check_start_with(field)
+                add_route('settlements', field.start_with, slicer)
+            elif settlement_search_type == 'txt_ln':
+                if not field.line_number:
+                    raise UserError(
+                        f'La configuración de la linea "{field.destination}" debe tener un "Numero de linea (.txt)"'
+                    )
+                add_line_number('settlements', field.line_number, slicer)
+
+        # Detalles de Transacción
+        if layout.transactions.search_type == 'txt_sw':
+            for field in layout.transactions.fields:
+                check_start_with(field)
+                add_route('transactions', field.start_with, (
+                    field.destination, field.starting_position, field.end_position, None
+                ))
+
+        # Trailers de Impuestos
+        if layout.trailers.search_type == 'txt_sw':
+            for field in layout.trailers.fields:
+                check_start_with(field)
+                if field.field_type == 'base':
+                    add_route('trailers', field.start_with, (
+                        field.destination, field.starting_position, field.end_position, None
+                    ))
+                elif field.field_type == 'tax':
+                    add_route('trailers', field.start_with, (
+                        field.settlement_tax_id, None, None, tuple(
+                            (tax_line.starting_position, tax_line.long, tax_line.decimals_amount)
+                            for tax_line in field.tax_lines
+                        )
+                    ))
 
-            if line:
-                trade_header_dict[field_config_id.destination_field_id.name] = line[
-                    field_config_id.starting_position:field_config_id.end_position
-                ]
-        return trade_header_dict
+        return router, line_number_slicers, settlement_search_type
 
-    def _parse_trade_header_xls_pandas(self, trade_header_dict, trade_header_field_config_ids, df_lines):
+    def _parse_trade_header_xls_pandas(self, trade_header_dict, trade_header_fields, df_lines):
         """
         df_lines: DataFrame con columna 'line' que contiene todas las líneas del archivo.
         """
-        for field_config_id in trade_header_field_config_ids:
-            row = field_config_id.row
-            col = field_config_id.col
+        for field_config in trade_header_fields:
+            row = field_config.row
+            col = field_config.col
 
             if not row or not col:
                 raise UserError(
-                    f'La configuración de la linea "{field_config_id.name}" debe tener una "Fila" '
+                    f'La configuración de la linea "{field_config.destination}" debe tener una "Fila" '
                     f'y una "Columna"'
                 )
 
@@ -121,93 +560,33 @@ class ExternalStatementFileProcessor:
                 value = df_lines.iat[row - 1, col - 1]
 
             if value:
-                trade_header_dict[field_config_id.destination_field_id.name] = value
+                trade_header_dict[field_config.destination] = value
         return trade_header_dict
 
-    def _parse_trade_header(self, df_lines, filename, external_bank_config_id, field_type):
+    def _parse_trade_header(self, df_lines, filename, layout):
         """Parsea la línea de encabezado del archivo usando pandas"""
-        trade_header_config_id = external_bank_config_id.trade_header_config_ids.filtered(
-            lambda l: l.field_type == field_type
-        )[:1]
-        if not trade_header_config_id:
-            raise UserError(
-                f'No se ha encontrado ninguna "Configuración de Cabecera de Comercio" con el tipo "{field_type}"'
-            )
-
-        trade_header_field_config_ids = self.env['trade.header.field.config'].search([
-            ('trade_header_config_id', '=', trade_header_config_id.id)
-        ])
-        if not trade_header_field_config_ids:
-            raise UserError(
-                f'No se ha encontrado ningún "Campo de Configuración de Cabecera de Comercio" '
-                f'para la Configuración de Cabecera de Comercio: "{trade_header_config_id.name}"'
-            )
-
         trade_header_dict = {'filename_external_statement': filename}
-        if field_type == 'txt':
-            trade_header_dict = self._parse_trade_header_txt_pandas(
-                trade_header_dict, trade_header_field_config_ids, df_lines
-            )
-        elif field_type in ('xls', 'xlsx'):
+        if layout.field_type in ('xls', 'xlsx'):
             trade_header_dict = self._parse_trade_header_xls_pandas(
-                trade_header_dict, trade_header_field_config_ids, df_lines
+                trade_header_dict, layout.trade_header.fields, df_lines
             )
 
         _logger.info(f'trade_header_dict -> {trade_header_dict}')
         return trade_header_dict
 
-    def _parse_settlement_header_txt_pandas(self, settlement_header_field_config_ids, df_lines, settlement_header_config):
-        settlement_header_lines = []
-        if settlement_header_config.search_type == 'txt_sw':
-            for df_line in df_lines['line']:
-                settlement_header_dict = {}
-                for field_config_id in settlement_header_field_config_ids:
-                    start_with = field_config_id.start_with
-                    if not start_with:
-                        raise UserError(
-                            f'La configuración de la linea "{field_config_id.name}" debe tener un '
-                            f'"Caracter de comienzo de linea (.txt)"'
-                        )
-                    if start_with and df_line.startswith(start_with):
-                        settlement_header_dict.update({
-                            field_config_id.destination_field_id.name:
-                                df_line[field_config_id.starting_position:field_config_id.end_position]
-                        })
-                if settlement_header_dict:
-                    settlement_header_lines.append(settlement_header_dict)
-        elif settlement_header_config.search_type == 'txt_ln':
-            settlement_header_dict = {}
-            for field_config_id in settlement_header_field_config_ids:
-                line_number = field_config_id.line_number
-                if not line_number:
-                    raise UserError(
-                        f'La configuración de la linea "{field_config_id.name}" debe tener un "Numero de linea (.txt)"'
-                    )
-                line = False
-                if 1 <= line_number <= len(df_lines):
-                    line = df_lines.iloc[line_number - 1]['line']
-                if line:
-                    settlement_header_dict.update({
-                            field_config_id.destination_field_id.name: line[
-                            field_config_id.starting_position:field_config_id.end_position
-                        ]
-                    })
-            settlement_header_lines.append(settlement_header_dict)
-        return settlement_header_lines
-
     def _parse_settlement_header_xls_pandas(
-            self, settlement_header_field_config_ids, df_lines, settlement_header_config
+            self, settlement_header_fields, df_lines, settlement_header_config
     ):
         settlement_header_lines = []
         # Caso excel_rc: filas y columnas específicas
         if settlement_header_config.search_type == 'excel_rc':
             settlement_header_dict = {}
-            for field_config_id in settlement_header_field_config_ids:
-                row = field_config_id.row
-                col = field_config_id.col
+            for field_config in settlement_header_fields:
+                row = field_config.row
+                col = field_config.col
                 if not row or not col:
                     raise UserError(
-                        f'La configuración de la linea "{field_config_id.name}" debe tener una "Fila" '
+                        f'La configuración de la linea "{field_config.destination}" debe tener una "Fila" '
                         f'y una "Columna"'
                     )
                 value = False
@@ -215,136 +594,137 @@ class ExternalStatementFileProcessor:
                     value = df_lines.iat[row - 1, col - 1]
 
                 if value:
-                    settlement_header_dict[field_config_id.destination_field_id.name] = value
+                    settlement_header_dict[field_config.destination] = value
             settlement_header_lines.append(settlement_header_dict)
         # Casos excel_init_with y excel_init_with_date
         elif settlement_header_config.search_type in ('excel_init_with', 'excel_init_with_date'):
             # 1. Buscar el field de liquidación
             liquidation_field = next(
-                (f for f in settlement_header_field_config_ids if getattr(f, "is_liquidation_number", False)),
+                (f for f in settlement_header_fields if getattr(f, "is_liquidation_number", False)),
                 None
             )
             if not liquidation_field or not liquidation_field.col:
                 raise UserError(
-                    f'Es obligatorio definir un campo con "is_liquidation_number" y "col"'
+                    'Es obligatorio definir un campo con "is_liquidation_number" y "col"'
                 )
-            # 2. Filtrar filas según el tipo
-            matched_rows = []
-            for _, row in df_lines.iterrows():
-                raw_value = row.iloc[liquidation_field.col - 1]
-                if settlement_header_config.search_type == "excel_init_with":
-                    # Filtrar por start_with
-                    if not liquidation_field.start_with:
-                        raise UserError(f'El campo de liquidación necesita "start_with" para este tipo de búsqueda')
-                    if str(raw_value).startswith(liquidation_field.start_with):
-                        matched_rows.append(row)
-                else:  # excel_init_with_date
-                    # Solo intentamos parsear si hay formatos definidos
-                    if not liquidation_field.origin_date_format or not liquidation_field.dest_date_format:
-                        raise UserError(f'El campo de liquidación necesita formatos de fecha definidos')
-                    try:
-                        parsed_date = datetime.strptime(str(raw_value), liquidation_field.origin_date_format)
-                        # Normalizamos
-                        row.iloc[liquidation_field.col - 1] = parsed_date.strftime(liquidation_field.dest_date_format)
-                        matched_rows.append(row)
-                    except (ValueError, TypeError):
-                        # Ignoramos filas que no sean fechas válidas
-                        continue
-            matched_rows = pd.DataFrame(matched_rows, columns=df_lines.columns) if matched_rows else pd.DataFrame(
-                columns=df_lines.columns)
-            # 3. Detectar campos de agrupación
+            liquidation_column = self._get_column(df_lines, liquidation_field.col)
+            if liquidation_column is None:
+                return settlement_header_lines
+            # 2. Filtrar filas según el tipo, con una máscara sobre la columna de liquidación
+            if settlement_header_config.search_type == "excel_init_with":
+                if not liquidation_field.start_with:
+                    raise UserError('El campo de liquidación necesita "start_with" para este tipo de búsqueda')
+                mask = liquidation_column.astype(str).str.startswith(liquidation_field.start_with)
+            else:  # excel_init_with_date
+                if not liquidation_field.origin_date_format or not liquidation_field.dest_date_format:
+                    raise UserError('El campo de liquidación necesita formatos de fecha definidos')
+                # Se ignoran las filas que no sean fechas válidas; las demás se normalizan
+                mask, liquidation_column = self._parse_date_column(
+                    liquidation_column, liquidation_field.origin_date_format, liquidation_field.dest_date_format
+                )
+            matched_df = df_lines[mask.to_numpy()]
+            # 3. Armar las columnas destino: siempre el número de liquidación y luego los otros campos
+            columns = {liquidation_field.destination: liquidation_column[mask]}
+            skip_masks = {}
+            for f_config in settlement_header_fields:
+                if f_config is liquidation_field:
+                    continue
+                column = self._get_column(matched_df, f_config.col)
+                if column is None:
+                    continue
+                # Si el campo es fecha → convertir, omitiendo las celdas que no sean fechas válidas
+                if settlement_header_config.search_type == "excel_init_with_date" and f_config.origin_date_format and f_config.dest_date_format:
+                    valid, column = self._parse_date_column(
+                        column, f_config.origin_date_format, f_config.dest_date_format
+                    )
+                    skip_masks[f_config.destination] = ~valid
+                columns[f_config.destination] = column
+            # 4. Quedarse con la primera fila de cada clave de agrupación
             group_by_fields = [
-                f.destination_field_id.name
-                for f in settlement_header_field_config_ids
+                f.destination
+                for f in settlement_header_fields
                 if getattr(f, "group_by", False)
             ]
-            seen_keys = set()
-            # 4. Recorrer cada fila encontrada
-            for _, row in matched_rows.iterrows():
-                row_dict = {}
-                # Guardamos siempre el número de liquidación
-                liquidation_value = row.iloc[liquidation_field.col - 1]
-                row_dict[liquidation_field.destination_field_id.name] = liquidation_value
-                # Guardamos los otros campos
-                for f_config in settlement_header_field_config_ids:
-                    if f_config is liquidation_field:
-                        continue
-                    c = f_config.col
-                    if c and 1 <= c <= len(row):
-                        value = row.iloc[c - 1]
-                        # Si el campo es fecha → convertir
-                        if settlement_header_config.search_type == "excel_init_with_date" and f_config.origin_date_format and f_config.dest_date_format:
-                            try:
-                                parsed_date = datetime.strptime(str(value), f_config.origin_date_format)
-                                value = parsed_date.strftime(f_config.dest_date_format)
-                            except (ValueError, TypeError):
-                                # Ignoramos campos de fecha no válidos
-                                continue
-                        row_dict[f_config.destination_field_id.name] = value
-                # Clave de agrupación
-                key = tuple(row_dict.get(c) for c in group_by_fields) if group_by_fields else None
-                # Solo agregamos si la clave no existe
-                if key is None or key not in seen_keys:
-                    if key is not None:
-                        seen_keys.add(key)
-                    settlement_header_lines.append(row_dict)
+            settlement_header_lines = self._columns_to_records(columns, skip_masks, group_by_fields)
         return settlement_header_lines
 
-    def _parse_settlement(self, df_lines, external_bank_config_id, field_type):
-        """Parsea una Cabecera de Liquidación"""
-        settlement_header_config_id = external_bank_config_id.settlement_header_config_ids.filtered(
-            lambda l: l.field_type == field_type
-        )[:1]
-        if not settlement_header_config_id:
-            raise UserError(
-                f'No se ha encontrado ninguna "Configuración de Cabecera de Liquidación" con el tipo "{field_type}"'
-            )
+    def _get_column(self, df_lines, col):
+        """Devuelve la columna 'col' (base 1) por posición, o None si no está configurada o no existe"""
+        if not col or not 1 <= col <= len(df_lines.columns):
+            return None
+        return df_lines.iloc[:, col - 1]
 
-        settlement_header_field_config_ids = self.env['settlement.header.field.config'].search([
-            ('settlement_header_config_id', '=', settlement_header_config_id.id)
-        ])
-        if not settlement_header_field_config_ids:
-            raise UserError(
-                f'No se ha encontrado ningún "Campo de Configuración de Cabecera de Liquidación" '
-                f'para la Configuración de Cabecera de Liquidación: "{settlement_header_config_id.name}"'
-            )
+    def _parse_date_column(self, column, origin_date_format, dest_date_format):
+        """
+        Parsea una columna completa con 'origin_date_format' (igual que strptime sobre el texto de la celda)
+        y devuelve (máscara de fechas válidas, columna formateada con 'dest_date_format').
+        """
+        import pandas as pd
+
+        text = column.astype(str)
+        try:
+            parsed = pd.to_datetime(text, format=origin_date_format, errors='coerce')
+        except (ValueError, TypeError):
+            # pandas >= 2 rechaza las columnas con distintos husos horarios aunque se pida 'coerce'
+            parsed = None
+        if hasattr(parsed, 'dt'):
+            return parsed.notna(), parsed.dt.strftime(dest_date_format)
+        # Fechas con distintos husos horarios no entran en una columna datetime: se resuelven por valor
+        def parse(value):
+            try:
+                return datetime.strptime(value, origin_date_format).strftime(dest_date_format)
+            except (ValueError, TypeError):
+                return None
+        dates = text.map(parse)
+        return dates.notna(), dates
+
+    def _columns_to_records(self, columns, skip_masks=None, group_by_fields=None):
+        """
+        Convierte columnas alineadas {destino: Series} en la lista de diccionarios que consume el wizard.
+        'skip_masks' ({destino: Series booleana}) marca las celdas que se omiten del diccionario y con
+        'group_by_fields' se conserva solo la primera fila de cada combinación de valores de esos campos.
+        """
+        import pandas as pd
+
+        skip_masks = skip_masks or {}
+        if group_by_fields:
+            keys = pd.DataFrame({
+                destination: columns[destination].where(~skip_masks[destination], None)
+                if destination in skip_masks else columns[destination]
+                for destination in group_by_fields if destination in columns
+            })
+            if keys.empty:
+                # Sin columnas de agrupación todas las filas comparten la misma clave
+                keep = [position == 0 for position in range(len(next(iter(columns.values()))))]
+            else:
+                keep = (~keys.duplicated()).to_numpy()
+            columns = {destination: column[keep] for destination, column in columns.items()}
+            skip_masks = {destination: mask[keep] for destination, mask in skip_masks.items()}
+
+        value_lists = []
+        for destination, column in columns.items():
+            values = column.tolist()
+            if destination in skip_masks:
+                for position in skip_masks[destination].to_numpy().nonzero()[0]:
+                    values[position] = SKIP_VALUE
+            value_lists.append(values)
+        return [
+            {destination: value for destination, value in zip(columns, values) if value is not SKIP_VALUE}
+            for values in zip(*value_lists)
+        ]
+
+    def _parse_settlement(self, df_lines, layout):
+        """Parsea una Cabecera de Liquidación"""
         settlement_header_lines = []
-        if field_type == 'txt':
-            settlement_header_lines = self._parse_settlement_header_txt_pandas(
-                settlement_header_field_config_ids, df_lines, settlement_header_config_id
-            )
-        elif field_type in ('xls', 'xlsx'):
+        if layout.field_type in ('xls', 'xlsx'):
             settlement_header_lines = self._parse_settlement_header_xls_pandas(
-                settlement_header_field_config_ids, df_lines, settlement_header_config_id
+                layout.settlements.fields, df_lines, layout.settlements
             )
         return settlement_header_lines
 
-
-    def _parse_transaction_detail_txt_pandas(self,  transaction_detail_field_config_ids, df_lines, transaction_detail_config):
-        transaction_detail_lines = []
-        if transaction_detail_config.search_type == 'txt_sw':
-            for df_line in df_lines['line']:
-                transaction_detail_dict = {}
-                for field_config_id in transaction_detail_field_config_ids:
-                    start_with = field_config_id.start_with
-                    if not start_with:
-                        raise UserError(
-                            f'La configuración de la linea "{field_config_id.name}" debe tener un '
-                            f'"Caracter de comienzo de linea (.txt)"'
-                        )
-                    if start_with and df_line.startswith(start_with):
-                        transaction_detail_dict.update({
-                            field_config_id.destination_field_id.name:
-                                df_line[field_config_id.starting_position:field_config_id.end_position]
-                        })
-                if transaction_detail_dict:
-                    transaction_detail_lines.append(transaction_detail_dict)
-        return transaction_detail_lines
-
-
     #TODO CONTEMPLAT CASO EN DONDE TENGA EN LUNERO DE LIQUIDACION REPETIDO POR FILA PERO NO SEA DATE
     def _parse_transaction_detail_xls_pandas(
-            self, transaction_detail_field_config_ids, df_lines, transaction_detail_config
+            self, transaction_detail_fields, df_lines, transaction_detail_config
     ):
         """
         Paso 1 -> excel_fixed_liquidation seguir por este caso
@@ -357,28 +737,9 @@ class ExternalStatementFileProcessor:
         if transaction_detail_config.search_type not in ('excel_init_with_date', 'excel_fixed_liquidation'):
             return transaction_detail_lines
 
-        def build_row_dict(row, main_field, field_configs):
-            """Construye un diccionario para una fila, asignando valores según configuración."""
-            # Acceso por índice para el campo principal
-            main_col_index = main_field.col - 1
-            main_value = row[main_col_index] if 0 <= main_col_index < len(row) else None
-
-            row_dict = {
-                main_field.destination_field_id.name: main_value
-            }
-
-            for f_config in field_configs:
-                if f_config.id == main_field.id or not f_config.col:
-                    continue
-                col_index = f_config.col - 1
-                if 0 <= col_index < len(row):
-                    value = row[col_index]  # Acceso por índice
-                    row_dict[f_config.destination_field_id.name] = None if pd.isna(value) else value
-            return row_dict
-
         if transaction_detail_config.search_type == 'excel_init_with_date':
             # Buscar campo de liquidación
-            liquidation_field = next((f for f in transaction_detail_field_config_ids if f.is_liquidation_number), None)
+            liquidation_field = next((f for f in transaction_detail_fields if f.is_liquidation_number), None)
             if not liquidation_field:
                 raise UserError('Debes configurar un campo de liquidación')
 
@@ -388,78 +749,64 @@ class ExternalStatementFileProcessor:
             if not (liquidation_field.origin_date_format and liquidation_field.dest_date_format):
                 raise UserError('El campo de liquidación necesita formatos de fecha definidos')
 
-            matched_rows = []
-            for row in df_lines.itertuples(index=False):
-                raw_value = getattr(row, df_lines.columns[liquidation_field.col - 1])
-                try:
-                    parsed_date = datetime.strptime(str(raw_value), liquidation_field.origin_date_format)
-                    values = list(row)
-                    values[liquidation_field.col - 1] = parsed_date.strftime(liquidation_field.dest_date_format)
-                    matched_rows.append(values)
-                except (ValueError, TypeError):
-                    continue  # Ignorar filas no válidas
-
-            matched_df = pd.DataFrame(matched_rows, columns=df_lines.columns)
-            for row in matched_df.itertuples(index=False):
-                transaction_detail_lines.append(
-                    build_row_dict(row, liquidation_field, transaction_detail_field_config_ids))
+            liquidation_column = self._get_column(df_lines, liquidation_field.col)
+            if liquidation_column is None:
+                return transaction_detail_lines
+            # Solo las filas cuya columna de liquidación es una fecha válida, ya normalizada
+            mask, liquidation_column = self._parse_date_column(
+                liquidation_column, liquidation_field.origin_date_format, liquidation_field.dest_date_format
+            )
+            transaction_detail_lines = self._transaction_detail_records(
+                df_lines[mask.to_numpy()], liquidation_column[mask], liquidation_field, transaction_detail_fields
+            )
 
         elif transaction_detail_config.search_type == 'excel_fixed_liquidation':
             # Campo fijo de liquidación en celda [2,2]
-            fixed_row, fixed_col = 2, 2
+            fixed_row, fixed_col = EXCEL_FIXED_LIQUIDATION_CELL
             liquidation_value = None
             if 1 <= fixed_row <= len(df_lines) and 1 <= fixed_col <= len(df_lines.columns):
                 liquidation_value = df_lines.iat[fixed_row - 1, fixed_col - 1]
 
             # Campo de liquidación tipo fila
             liquidation_field_row = next(
-                (f for f in transaction_detail_field_config_ids if
+                (f for f in transaction_detail_fields if
                  f.is_liquidation_number and f.liquidation_type == 'row'),
                 None
             )
             _logger.info(f'liquidation_field_row -> {liquidation_field_row}')
+            if not liquidation_field_row or not liquidation_field_row.col:
+                raise UserError('Es obligatorio definir un campo con "is_liquidation_number" y "col"')
 
-            matched_rows = []
-            for row in df_lines.itertuples(index=False):
-                # Obtener el valor por índice de columna en lugar de por nombre
-                col_index = liquidation_field_row.col - 1
-                if 0 <= col_index < len(row):
-                    row_value = row[col_index]  # Acceso por índice
-                    if row_value == liquidation_value:
-                        matched_rows.append(row)
-            _logger.info(f'matched_rows -> {matched_rows}')
-
-            matched_df = pd.DataFrame(matched_rows, columns=df_lines.columns)
-            for row in matched_df.itertuples(index=False):
-                transaction_detail_lines.append(
-                    build_row_dict(row, liquidation_field_row, transaction_detail_field_config_ids))
+            liquidation_column = self._get_column(df_lines, liquidation_field_row.col)
+            if liquidation_column is None:
+                return transaction_detail_lines
+            mask = (liquidation_column == liquidation_value).to_numpy()
+            _logger.info(f'matched_rows -> {mask.sum()}')
+            transaction_detail_lines = self._transaction_detail_records(
+                df_lines[mask], liquidation_column[mask], liquidation_field_row, transaction_detail_fields
+            )
 
         return transaction_detail_lines
 
-    def _parse_transaction2(self, df_lines, external_bank_config_id, field_type):
-        transaction_detail_config_id = external_bank_config_id.transaction_detail_config_ids.filtered(
-            lambda l: l.field_type == field_type
-        )[:1]
-        if not transaction_detail_config_id:
-            raise UserError(
-                f'No se ha encontrado ninguna "Configuración de Detalle de Transacción" con el tipo "{field_type}"'
-            )
-        transaction_detail_field_config_ids = self.env['transaction.detail.field.config'].search([
-            ('transaction_detail_config_id', '=', transaction_detail_config_id.id)
-        ])
-        if not transaction_detail_field_config_ids:
-            raise UserError(
-                f'No se ha encontrado ningún "Campo de Configuración de Detalle de Transacción" '
-                f'para la Configuración de Detalle de Transacción: "{transaction_detail_config_id.name}"'
-            )
+    def _transaction_detail_records(self, matched_df, liquidation_column, liquidation_field, transaction_detail_fields):
+        """
+        Arma los detalles de transacción de las filas encontradas columna a columna: el número de liquidación
+        y el resto de los campos configurados, con las celdas vacías como None.
+        """
+        columns = {liquidation_field.destination: liquidation_column}
+        for f_config in transaction_detail_fields:
+            if f_config is liquidation_field:
+                continue
+            column = self._get_column(matched_df, f_config.col)
+            if column is not None:
+                columns[f_config.destination] = column.where(~(column.isna() | column.eq('')), None)
+        return self._columns_to_records(columns)
+
+    def _parse_transaction2(self, df_lines, layout):
         transaction_detail_lines = []
-        if field_type == 'txt':
-            transaction_detail_lines = self._parse_transaction_detail_txt_pandas(
-                transaction_detail_field_config_ids, df_lines, transaction_detail_config_id
-            )
-        elif field_type in ('xls', 'xlsx', 'csv'):
+        if layout.field_type in ('xls', 'xlsx', 'csv'):
             transaction_detail_lines = self._parse_transaction_detail_xls_pandas(
-                transaction_detail_field_config_ids, df_lines, transaction_detail_config_id
+                layout.transactions.fields, df_lines, layout.transactions
             )
 
         return transaction_detail_lines
@@ -476,59 +823,16 @@ class ExternalStatementFileProcessor:
             'settlement_number': line[54:61],
         }
 
-    def _parse_settlement_tax_txt_pandas(self, settlement_tax_ids, df_lines, settlement_tax_config_id):
-        settlement_tax_lines = []
-        if settlement_tax_config_id.search_type == 'txt_sw':
-            for df_line in df_lines['line']:
-                settlement_tax_dict = {}
-                for field_config_id in settlement_tax_ids:
-                    start_with = field_config_id.start_with
-                    if not start_with:
-                        raise UserError(
-                            f'La configuración de la linea "{field_config_id.name}" debe tener un '
-                            f'"Caracter de comienzo de linea (.txt)"'
-                        )
-                    if start_with and df_line.startswith(start_with):
-                        tax_line_amounts = []
-                        if field_config_id.field_type == 'base':
-                            settlement_tax_dict.update({
-                                field_config_id.destination_field_id.name:
-                                    df_line[field_config_id.starting_position:field_config_id.end_position]
-                            })
-
-                        #TODO SEGUIR POR ACA
-                        elif field_config_id.field_type == 'tax':
-                            for settlement_tax_line_id in field_config_id.settlement_tax_line_ids:
-                                init = settlement_tax_line_id.starting_position
-                                long = settlement_tax_line_id.long
-                                amount_str = df_line[init:init + long - 1]
-                                decimals_amount = settlement_tax_line_id.decimals_amount
-                                # TODO: PARAMETRIZAR OBTENCION DE SIGNO
-                                sign_str = df_line[init + long - 1:init + long]
-                                sign = 1 if sign_str == '1' else -1
-                                tax_line_amounts.append(
-                                    float(f'{amount_str[:-decimals_amount]}.{amount_str[-decimals_amount:]}') * sign
-                                )
-                                ########
-                            settlement_tax_dict.update({
-                                'settlement_tax_id': field_config_id.id,
-                                'total': sum(tax_line_amounts)
-                            })
-                if settlement_tax_dict:
-                    settlement_tax_lines.append(settlement_tax_dict)
-
-        return settlement_tax_lines
-
-    def _parse_settlement_tax_xls_pandas(self, settlement_tax_ids, df_lines, settlement_tax_config_id):
+    def _parse_settlement_tax_xls_pandas(self, settlement_tax_fields, df_lines, settlement_tax_config):
         """
         if settlement_header_config.search_type == 'excel_rc':
             settlement_header_dict = {}
-            for field_config_id in settlement_header_field_config_ids:
-                row = field_config_id.row
-                col = field_config_id.col
+            for field_config in settlement_header_fields:
+                row = field_config.row
+                col = field_config.col
                 if not row or not col:
                     raise UserError(
-                        f'La configuración de la linea "{field_config_id.name}" debe tener una "Fila" '
+                        f'La configuración de la linea "{field_config.destination}" debe tener una "Fila" '
                         f'y una "Columna"'
                     )
                 value = False
@@ -536,34 +840,36 @@ class ExternalStatementFileProcessor:
                     value = df_lines.iat[row - 1, col - 1]
 
                 if value:
-                    settlement_header_dict[field_config_id.destination_field_id.name] = value
+                    settlement_header_dict[field_config.destination] = value
             settlement_header_lines.append(settlement_header_dict)
         """
+        import pandas as pd
+
         settlement_tax_lines = []
-        if settlement_tax_config_id.search_type == 'excel_rc':
+        if settlement_tax_config.search_type == 'excel_rc':
             settlement_tax_dict = {}
-            for field_config_id in settlement_tax_ids:
-                if field_config_id.field_type == 'base':
-                    row = field_config_id.row
-                    col = field_config_id.col
+            for field_config in settlement_tax_fields:
+                if field_config.field_type == 'base':
+                    row = field_config.row
+                    col = field_config.col
                     if not row or not col:
                         raise UserError(
-                            f'La configuración de la linea "{field_config_id.name}" debe tener una "Fila" '
+                            f'La configuración de la linea "{field_config.destination}" debe tener una "Fila" '
                             f'y una "Columna"'
                         )
                     value = False
                     if 1 <= row <= len(df_lines) and 1 <= col <= len(df_lines.columns):
                         value = df_lines.iat[row - 1, col - 1]
                     if value:
-                        settlement_tax_dict[field_config_id.destination_field_id.name] = value
-                if field_config_id.field_type == 'tax':
+                        settlement_tax_dict[field_config.destination] = value
+                if field_config.field_type == 'tax':
                     tax_line_amounts = []
-                    for settlement_tax_line_id in field_config_id.settlement_tax_line_ids:
-                        row = settlement_tax_line_id.row
-                        col = settlement_tax_line_id.col
+                    for tax_line in field_config.tax_lines:
+                        row = tax_line.row
+                        col = tax_line.col
                         if not row or not col:
                             raise UserError(
-                                f'La configuración de la linea "{field_config_id.name}" debe tener una "Fila" '
+                                f'La configuración de la linea "{field_config.destination}" debe tener una "Fila" '
                                 f'y una "Columna"'
                             )
                         value = False
@@ -575,161 +881,142 @@ class ExternalStatementFileProcessor:
                             )
 
                     settlement_tax_dict.update({
-                        'settlement_tax_id': field_config_id.id,
+                        'settlement_tax_id': field_config.settlement_tax_id,
                         'total': sum(tax_line_amounts)
                     })
             if settlement_tax_dict:
                 settlement_tax_lines.append(settlement_tax_dict)
-        elif settlement_tax_config_id.search_type == 'excel_tax_name':
+        elif settlement_tax_config.search_type == 'excel_tax_name':
+            tax_lines = [
+                tax_line for field_config in settlement_tax_fields if field_config.field_type == 'tax'
+                for tax_line in field_config.tax_lines
+            ]
+            # Una sola pasada sobre la hoja para ubicar todos los nombres de impuesto configurados
+            cell_index = self._build_cell_index(
+                df_lines, list({tax_line.tax_name for tax_line in tax_lines if tax_line.tax_name})
+            )
             settlement_tax_dict = {}
-            for field_config_id in settlement_tax_ids:
-                if field_config_id.field_type == 'base':
-                    row = field_config_id.row
-                    col = field_config_id.col
+            for field_config in settlement_tax_fields:
+                if field_config.field_type == 'base':
+                    row = field_config.row
+                    col = field_config.col
                     if not row or not col:
                         raise UserError(
-                            f'La configuración de la linea "{field_config_id.name}" debe tener una "Fila" '
+                            f'La configuración de la linea "{field_config.destination}" debe tener una "Fila" '
                             f'y una "Columna"'
                         )
                     value = False
                     if 1 <= row <= len(df_lines) and 1 <= col <= len(df_lines.columns):
                         value = df_lines.iat[row - 1, col - 1]
                     if value:
-                        settlement_tax_dict[field_config_id.destination_field_id.name] = value
-                elif field_config_id.field_type == 'tax':
+                        settlement_tax_dict[field_config.destination] = value
+                elif field_config.field_type == 'tax':
                     tax_line_amounts = []
-                    for settlement_tax_line_id in field_config_id.settlement_tax_line_ids:
-                        positions_amount = settlement_tax_line_id.positions_amount
-                        direction = settlement_tax_line_id.direction
-                        tax_name = settlement_tax_line_id.tax_name
+                    for tax_line in field_config.tax_lines:
+                        cell = cell_index.get(tax_line.tax_name)
+                        if cell is None:
+                            continue
+                        if tax_line.direction not in TAX_NAME_DIRECTIONS:
+                            raise UserError(f"Dirección desconocida: {tax_line.direction}")
+                        row_offset, col_offset = TAX_NAME_DIRECTIONS[tax_line.direction]
+                        target_row = cell[0] + row_offset * (tax_line.positions_amount or 0)
+                        target_col = cell[1] + col_offset * (tax_line.positions_amount or 0)
                         value = False
-
-                        match = df_lines.isin([tax_name])
-                        if match.any().any():
-                            row_idx, col_idx = match.stack()[match.stack()].index[0]
-
-                            if direction == "Up":
-                                target_row, target_col = row_idx - positions_amount, col_idx
-                            elif direction == "Down":
-                                target_row, target_col = row_idx + positions_amount, col_idx
-                            elif direction == "Left":
-                                target_row, target_col = row_idx, col_idx - positions_amount
-                            elif direction == "Right":
-                                target_row, target_col = row_idx, col_idx + positions_amount
-                            else:
-                                raise UserError(f"Dirección desconocida: {direction}")
-                        # 4) Si se encontró valor numérico, lo guardo
+                        if 0 <= target_row < len(df_lines) and 0 <= target_col < len(df_lines.columns):
+                            value = df_lines.iat[target_row, target_col]
+                        # Si se encontró valor numérico, lo guardo
                         if value:
-                            tax_line_amounts.append(float(value))
+                            tax_line_amounts.append(_parse_number(value))
                     settlement_tax_dict.update({
-                        'settlement_tax_id': field_config_id.id,
+                        'settlement_tax_id': field_config.settlement_tax_id,
                         'total': sum(tax_line_amounts)
                     })
             if settlement_tax_dict:
                 settlement_tax_lines.append(settlement_tax_dict)
-        elif settlement_tax_config_id.search_type == 'sum_col_row':
-            base_field = next((f for f in settlement_tax_ids if f.field_type == 'base'), None)
+        elif settlement_tax_config.search_type == 'sum_col_row':
+            base_field = next((f for f in settlement_tax_fields if f.field_type == 'base'), None)
             if not base_field or not getattr(base_field, 'col', None):
                 raise UserError('Para search_type "sum_col_row" es obligatorio definir un campo "base" con "col"')
 
-            base_col_idx = base_field.col - 1
-
-            def normalize_settlement_value(raw_value):
-                if pd.isna(raw_value):
-                    return None
-                s = str(raw_value).strip()
-                if getattr(base_field, 'origin_date_format', None) and getattr(base_field, 'dest_date_format',
-                                                                               None):
-                    try:
-                        parsed = datetime.strptime(s, base_field.origin_date_format)
-                        return parsed.strftime(base_field.dest_date_format)
-                    except (ValueError, TypeError):
-                        return s
-                return s
-
-            def parse_number(val):
-                if val is None or (isinstance(val, float) and pd.isna(val)):
-                    return 0.0
-                s = str(val).strip()
-                if s == '':
-                    return 0.0
-                for token in ['$', '€', 'USD', 'ARS', ' ']:
-                    s = s.replace(token, '')
-                if s.count('.') > 0 and s.count(',') > 0:
-                    s = s.replace('.', '').replace(',', '.')
-                else:
-                    s = s.replace(',', '.')
-                try:
-                    return float(s)
-                except Exception:
-                    return 0.0
-
-            settlement_map = {}
-
-            for row_idx in range(len(df_lines)):
-                try:
-                    settlement_raw = df_lines.iat[row_idx, base_col_idx]
-                except Exception:
-                    continue
-                settlement_key = normalize_settlement_value(settlement_raw)
-                if not settlement_key:
-                    continue
+            settlement_column = self._get_column(df_lines, base_field.col)
+            if settlement_column is None:
+                return settlement_tax_lines
 
-                if settlement_key not in settlement_map:
-                    settlement_map[settlement_key] = {}
-
-                for settlement_tax in settlement_tax_ids:
-                    if settlement_tax.field_type != 'tax':
+            # 1. Normalizar una sola vez la columna de liquidación (texto o fecha reformateada)
+            settlement_keys = settlement_column.astype(str).str.strip().where(settlement_column.notna(), None)
+            if getattr(base_field, 'origin_date_format', None) and getattr(base_field, 'dest_date_format', None):
+                valid, dates = self._parse_date_column(
+                    settlement_keys, base_field.origin_date_format, base_field.dest_date_format
+                )
+                settlement_keys = dates.where(valid, settlement_keys)
+            rows_mask = (settlement_keys.notna() & settlement_keys.ne('')).to_numpy()
+
+            # 2. Una columna numérica por impuesto, sumando sus columnas de importe
+            tax_amounts = {}
+            amount_columns = {}
+            for settlement_tax in settlement_tax_fields:
+                if settlement_tax.field_type != 'tax':
+                    continue
+                amounts = tax_amounts.setdefault(settlement_tax.settlement_tax_id, pd.Series(0.0, index=df_lines.index))
+                for tax_line in settlement_tax.tax_lines:
+                    if not getattr(tax_line, 'col', None):
                         continue
-                    tax_total = settlement_map[settlement_key].get(settlement_tax.id, 0.0)
-                    for tax_line in settlement_tax.settlement_tax_line_ids:
-                        if not getattr(tax_line, 'col', None):
-                            continue
-                        col_idx = tax_line.col - 1
-                        if 0 <= col_idx < len(df_lines.columns):
-                            raw_val = df_lines.iat[row_idx, col_idx]
-                            tax_total += parse_number(raw_val)
-                    if tax_total:
-                        settlement_map[settlement_key][settlement_tax.id] = tax_total
-
-            # Convertir a formato compatible con _create_trailers
-            for settlement_key, taxes in settlement_map.items():
+                    if tax_line.col not in amount_columns:
+                        amount_column = self._get_column(df_lines, tax_line.col)
+                        amount_columns[tax_line.col] = (
+                            None if amount_column is None else self._parse_number_column(amount_column)
+                        )
+                    if amount_columns[tax_line.col] is not None:
+                        amounts = amounts + amount_columns[tax_line.col]
+                tax_amounts[settlement_tax.settlement_tax_id] = amounts
+            if not tax_amounts:
+                return settlement_tax_lines
+
+            # 3. Totales por (liquidación, impuesto) con un único groupby, en orden de aparición
+            totals = pd.DataFrame(tax_amounts)[rows_mask].groupby(
+                settlement_keys[rows_mask].to_numpy(), sort=False
+            ).sum()
+
+            # Convertir a formato compatible con _prepare_trailer_vals
+            for settlement_key, taxes in totals.to_dict('index').items():
                 for tid, total in taxes.items():
-                    settlement_tax_lines.append({
-                        'settlement_number': settlement_key,
-                        'settlement_tax_id': tid,
-                        'total': total
-                    })
+                    if total:
+                        settlement_tax_lines.append({
+                            'settlement_number': settlement_key,
+                            'settlement_tax_id': tid,
+                            'total': total
+                        })
 
         return settlement_tax_lines
 
-    def _parse_trailer2(self, df_lines, external_bank_config_id, field_type):
-        settlement_tax_config_id = external_bank_config_id.settlement_tax_config_ids.filtered(
-            lambda l: l.field_type == field_type
-        )[:1]
-        if not settlement_tax_config_id:
-            raise UserError(
-                f'No se ha encontrado ninguna "Configuración de Impuesto" con el tipo "{field_type}"'
-            )
+    def _parse_number_column(self, column):
+        """Versión vectorizada de '_parse_number' para una columna completa de importes"""
+        import pandas as pd
 
-        _logger.info(f'settlement_tax_config_id -> {settlement_tax_config_id}')
-        settlement_tax_ids = self.env['settlement.tax'].search([
-            ('settlement_tax_config_id', '=', settlement_tax_config_id.id)
-        ])
-        if not settlement_tax_ids:
-            raise UserError(
-                f'No se ha encontrado ningún "Campo de Configuración de Impuestos" '
-                f'para la Configuración de Impuestos: "{settlement_tax_config_id.name}"'
-            )
+        text = column.astype(str).where(column.notna(), '').str.strip()
+        for token in ['$', '€', 'USD', 'ARS', ' ']:
+            text = text.str.replace(token, '', regex=False)
+        has_thousands = text.str.contains('.', regex=False) & text.str.contains(',', regex=False)
+        text = text.str.replace('.', '', regex=False).where(has_thousands, text).str.replace(',', '.', regex=False)
+        return pd.to_numeric(text, errors='coerce').fillna(0.0)
 
+    def _build_cell_index(self, df_lines, values):
+        """
+        Recorre la hoja una única vez y devuelve {valor: (fila, columna)} (posiciones base 0) con la primera
+        celda, en orden de filas, que contiene cada uno de los valores buscados.
+        """
+        if not values or df_lines.empty:
+            return {}
+        cell_index = {}
+        for row_idx, col_idx in zip(*df_lines.isin(values).to_numpy().nonzero()):
+            cell_index.setdefault(df_lines.iat[row_idx, col_idx], (int(row_idx), int(col_idx)))
+        return cell_index
+
+    def _parse_trailer2(self, df_lines, layout):
         settlement_tax_lines = []
-        if field_type == 'txt':
-            settlement_tax_lines = self._parse_settlement_tax_txt_pandas(
-                settlement_tax_ids, df_lines, settlement_tax_config_id
-            )
-        elif field_type in ('xls', 'xlsx', 'csv'):
+        if layout.field_type in ('xls', 'xlsx', 'csv'):
             settlement_tax_lines = self._parse_settlement_tax_xls_pandas(
-                settlement_tax_ids, df_lines, settlement_tax_config_id
+                layout.trailers.fields, df_lines, layout.trailers
             )
 
         return settlement_tax_lines
@@ -0,0 +1,79 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+_logger = logging.getLogger(__name__)
+
+# Versión del formato de los datos parseados: al cambiarla se descarta todo lo cacheado anteriormente
+PARSE_CACHE_VERSION = 1
+
+
+class ExternalStatementParseCache:
+    """
+    Cache en disco del resultado de 'process_file' (trade_header, settlements, transactions, trailers).
+
+    La clave combina el contenido del archivo, su nombre y el layout compilado de la configuración del banco,
+    por lo que cualquier cambio en la configuración invalida las entradas anteriores. Cada entrada es un
+    pickle; al superar el tamaño máximo se eliminan las entradas usadas hace más tiempo (LRU por mtime).
+    """
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+
+    def get_key(self, file_checksum, filename, layout):
+        """Clave de la entrada: SHA-256 del contenido, nombre del archivo y huella del layout compilado"""
+        return hashlib.sha256(
+            f'{PARSE_CACHE_VERSION}|{file_checksum}|{filename}|{layout!r}'.encode()
+        ).hexdigest()
+
+    def get(self, key):
+        """Devuelve los datos cacheados o None si no hay una entrada válida"""
+        path = self._get_path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                data = pickle.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+            _logger.warning(f'Entrada inválida en el cache de parseo, se descarta: {path}')
+            self._remove(path)
+            return None
+        # Marca la entrada como usada recientemente para la eliminación por antigüedad
+        os.utime(path)
+        return data
+
+    def set(self, key, data):
+        """Guarda los datos parseados y libera espacio si el cache supera el tamaño máximo"""
+        os.makedirs(self.directory, exist_ok=True)
+        # Escritura atómica: otro proceso nunca lee una entrada a medio escribir
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix='.tmp', delete=False) as temp_file:
+            pickle.dump(data, temp_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file.name, self._get_path(key))
+        self._evict()
+
+    def _evict(self):
+        """Elimina las entradas usadas hace más tiempo hasta que el cache no supere el tamaño máximo"""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith('.pickle'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            self._remove(path)
+            total_size -= size
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, f'{key}.pickle')
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass